@@ -73,9 +73,19 @@ export class ZenLeapAgentChild extends JSWindowActorChild {
       case 'ZenLeapAgent:TeardownConsoleCapture':
         return this.#teardownConsoleCapture();
       case 'ZenLeapAgent:GetConsoleLogs':
-        return { logs: [...this.#consoleLogs] };
+        // `since` (ISO timestamp) returns only newer entries, so callers
+        // polling in a loop don't re-ship the whole cumulative log
+        return {
+          logs: data.since
+            ? this.#consoleLogs.filter(l => l.timestamp > data.since)
+            : [...this.#consoleLogs],
+        };
       case 'ZenLeapAgent:GetConsoleErrors':
-        return { errors: [...this.#consoleErrors] };
+        return {
+          errors: data.since
+            ? this.#consoleErrors.filter(e => e.timestamp > data.since)
+            : [...this.#consoleErrors],
+        };
       case 'ZenLeapAgent:EvalJS':
         return this.#evalInContent(data.expression);
       case 'ZenLeapAgent:QuerySelector':
@@ -242,37 +252,50 @@ export class ZenLeapAgentChild extends JSWindowActorChild {
       total: elements.length,
     };
 
+    // Fingerprint each element once per snapshot; diffs then reduce to
+    // Set-membership scans over precomputed keys
+    const currentKeys = elements.map(el => this.#domKeyOf(el));
+
     // Incremental diffing: compare with previous snapshot
     if (incremental && this.#previousDOM) {
-      const diff = this.#computeDOMDiff(this.#previousDOM, elements);
+      const diff = this.#computeDOMDiff(this.#previousDOM, elements, currentKeys);
       result.diff = diff;
       result.incremental = true;
     }
 
-    // Store current snapshot for next incremental call
-    this.#previousDOM = elements.map(el => ({
+    // Store current snapshot (keys + display fields) for next incremental call
+    this.#previousDOM = elements.map((el, i) => ({
+      key: currentKeys[i],
       tag: el.tag,
       text: el.text,
-      href: el.attributes?.href || '',
-      name: el.attributes?.name || '',
     }));
 
     return result;
   }
 
-  #computeDOMDiff(prev, current) {
-    // Key elements by tag|text|href|name for stable identity
-    const keyOf = (el) => (el.tag || '') + '|' + (el.text || '') + '|' + (el.href || el.attributes?.href || '') + '|' + (el.name || el.attributes?.name || '');
-
-    const prevKeys = new Set(prev.map(keyOf));
-    const currKeys = new Set(current.map(keyOf));
+  // Stable identity key: tag|text|href|name
+  #domKeyOf(el) {
+    return (el.tag || '') + '|' + (el.text || '') + '|' +
+      (el.attributes?.href || '') + '|' + (el.attributes?.name || '');
+  }
 
-    const added = current.filter(el => !prevKeys.has(keyOf(el))).map(el => ({
-      index: el.index, tag: el.tag, text: el.text,
-    }));
-    const removed = prev.filter(el => !currKeys.has(keyOf(el))).map(el => ({
-      tag: el.tag, text: el.text,
-    }));
+  #computeDOMDiff(prev, current, currentKeys) {
+    // Both sides carry precomputed identity keys, so each element is
+    // fingerprinted exactly once per snapshot instead of twice per diff
+    const prevKeys = new Set();
+    for (const p of prev) prevKeys.add(p.key);
+    const currKeys = new Set(currentKeys);
+
+    const added = [];
+    for (let i = 0; i < current.length; i++) {
+      if (!prevKeys.has(currentKeys[i])) {
+        added.push({ index: current[i].index, tag: current[i].tag, text: current[i].text });
+      }
+    }
+    const removed = [];
+    for (const p of prev) {
+      if (!currKeys.has(p.key)) removed.push({ tag: p.tag, text: p.text });
+    }
 
     return {
       added: added.length,
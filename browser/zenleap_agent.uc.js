@@ -245,7 +245,7 @@
     // Clear global state that outlives sessions
     interceptRules.length = 0;
     interceptNextId = 1;
-    networkLog.length = 0;
+    clearNetworkLog();
     networkMonitorActive = false;
     pendingDialogs.length = 0;
     dialogWindowRefs.clear();
@@ -452,8 +452,9 @@
 
         this.#frameBuffer = this.#frameBuffer.slice(frame.totalLength);
 
-        if (frame.opcode === 0x1) {
-          // Text frame
+        if (frame.opcode === 0x1 || frame.opcode === 0x2) {
+          // Text frame — or a binary frame carrying UTF-8 JSON (clients
+          // using fast encoders like orjson send bytes directly)
           this.#onMessage(frame.payload);
         } else if (frame.opcode === 0x8) {
           // Close frame
@@ -556,7 +557,11 @@
     }
 
     send(text) {
-      this.#sendFrame(text);
+      // Binary opcode: the payload is UTF-8 JSON either way, but binary
+      // frames let Python websockets clients skip per-message UTF-8
+      // validation (costly on multi-MB get_dom/screenshot responses);
+      // json/orjson decode bytes directly.
+      this.#sendFrame(text, 0x2);
     }
 
     // --- Raw I/O ---
@@ -619,6 +624,22 @@
         return;
       }
 
+      // Batched JSON-RPC: a top-level array of envelopes is handled
+      // concurrently and answered with a single array reply, saving one
+      // WS frame + syscall per command for clients that batch.
+      if (Array.isArray(msg)) {
+        Promise.all(msg.map(m => this.#handleCommand(m))).then(responses => {
+          this.send(JSON.stringify(responses));
+        }).catch(e => {
+          log('Unhandled error in batch handler: ' + e);
+          this.send(JSON.stringify({
+            id: null,
+            error: { code: -1, message: 'Internal error: ' + e.message }
+          }));
+        });
+        return;
+      }
+
       // Handle JSON-RPC
       this.#handleCommand(msg).then(response => {
         this.send(JSON.stringify(response));
@@ -1004,8 +1025,32 @@
   // ============================================
 
   let networkMonitorActive = false;
-  const networkLog = [];           // Circular buffer of network entries
   const MAX_NETWORK_LOG = 500;
+  const networkLog = new Array(MAX_NETWORK_LOG);  // Preallocated ring buffer
+  let networkLogWriteIdx = 0;      // Next slot to overwrite
+  let networkLogSeq = 0;           // Monotonic sequence number (last assigned)
+
+  // O(1) ring-buffer write — push+shift on a plain array is O(N) per entry
+  function pushNetworkEntry(entry) {
+    entry.seq = ++networkLogSeq;
+    networkLog[networkLogWriteIdx] = entry;
+    networkLogWriteIdx = (networkLogWriteIdx + 1) % MAX_NETWORK_LOG;
+  }
+
+  // Snapshot entries oldest→newest
+  function getNetworkEntries() {
+    const out = [];
+    for (let i = 0; i < MAX_NETWORK_LOG; i++) {
+      const e = networkLog[(networkLogWriteIdx + i) % MAX_NETWORK_LOG];
+      if (e) out.push(e);
+    }
+    return out;
+  }
+
+  function clearNetworkLog() {
+    networkLog.fill(undefined);
+    networkLogWriteIdx = 0;
+  }
   const interceptRules = [];       // {id, pattern: RegExp, action: 'block'|'modify_headers', headers: {}}
   let interceptNextId = 1;
 
@@ -1034,20 +1079,19 @@
         if (!networkMonitorActive) return;
 
         if (topic === 'http-on-modify-request') {
-          networkLog.push({
+          pushNetworkEntry({
             url,
             method: channel.requestMethod,
             type: 'request',
             timestamp: new Date().toISOString(),
           });
-          if (networkLog.length > MAX_NETWORK_LOG) networkLog.shift();
         } else if (topic === 'http-on-examine-response') {
           // Find matching request and update, or add new entry
           let status = 0;
           let contentType = '';
           try { status = channel.responseStatus; } catch (e) {}
           try { contentType = channel.getResponseHeader('Content-Type'); } catch (e) {}
-          networkLog.push({
+          pushNetworkEntry({
             url,
             method: channel.requestMethod,
             type: 'response',
@@ -1055,7 +1099,6 @@
             content_type: contentType,
             timestamp: new Date().toISOString(),
           });
-          if (networkLog.length > MAX_NETWORK_LOG) networkLog.shift();
         }
       } catch (e) {
         // Non-HTTP channel or other error — ignore
@@ -1081,7 +1124,7 @@
   const RECORDING_EXCLUDE = new Set([
     'ping', 'get_agent_logs', 'record_start', 'record_stop',
     'record_save', 'record_replay', 'get_tab_events', 'get_dialogs',
-    'list_tabs', 'list_workspace_tabs', 'claim_tab', 'get_page_info', 'get_navigation_status',
+    'list_tabs', 'list_workspace_tabs', 'claim_tab', 'get_page_info', 'get_navigation_status', 'reflect',
     'network_get_log', 'intercept_list_rules', 'eval_chrome',
     'session_info', 'session_close', 'list_sessions',
   ]);
@@ -1111,6 +1154,10 @@
         entry.httpStatus = 0;
         entry.errorCode = 0;
         entry.url = request?.name || '';
+        // Monotonic per-browser counter of navigation starts, so
+        // wait_for_load can tell "finished loading" from "hasn't
+        // started yet" (navigate defers its loadURI to a macrotask).
+        entry.navCount = (entry.navCount || 0) + 1;
       }
       if (stateFlags & Ci.nsIWebProgressListener.STATE_STOP) {
         entry.loading = false;
@@ -1492,6 +1539,7 @@
         http_status: entry.httpStatus || 0,
         error_code: entry.errorCode || 0,
         loading: browser.webProgress?.isLoadingDocument || false,
+        nav_count: entry.navCount || 0,
       };
     },
 
@@ -1549,6 +1597,37 @@
       return await actor.sendQuery('ZenLeapAgent:GetAccessibilityTree');
     },
 
+    // Fused observation: screenshot + page text + page info in one round-trip,
+    // so clients don't pay WebSocket latency three times per reflection.
+    reflect: async ({ tab_id, frame_id, include_screenshot = true, include_text = true, text_limit }, ctx) => {
+      const tab = ctx.resolveTab(tab_id);
+      if (!tab) throw new Error('Tab not found');
+      const browser = tab.linkedBrowser;
+      const result = {
+        url: browser.currentURI?.spec || '',
+        title: tab.label || '',
+        loading: browser.webProgress?.isLoadingDocument || false,
+      };
+      const jobs = [];
+      if (include_screenshot) {
+        jobs.push(screenshotTab(tab).then((shot) => {
+          result.image = shot.image;
+          result.width = shot.width;
+          result.height = shot.height;
+        }));
+      }
+      if (include_text) {
+        const actor = getActorForTab(tab, frame_id);
+        jobs.push(actor.sendQuery('ZenLeapAgent:GetPageText').then((r) => {
+          let text = r.text || '';
+          if (text_limit && text.length > text_limit) text = text.slice(0, text_limit);
+          result.text = text;
+        }));
+      }
+      await Promise.all(jobs);
+      return result;
+    },
+
     // --- Interaction ---
     click_element: async ({ tab_id, frame_id, index }, ctx) => {
       if (index === undefined || index === null) throw new Error('index is required');
@@ -1612,16 +1691,16 @@
       return await actorInteraction(tab, 'ZenLeapAgent:TeardownConsoleCapture', {}, null, frame_id);
     },
 
-    console_get_logs: async ({ tab_id, frame_id }, ctx) => {
+    console_get_logs: async ({ tab_id, frame_id, since }, ctx) => {
       const tab = ctx.resolveTab(tab_id);
       const actor = getActorForTab(tab, frame_id);
-      return await actor.sendQuery('ZenLeapAgent:GetConsoleLogs');
+      return await actor.sendQuery('ZenLeapAgent:GetConsoleLogs', { since });
     },
 
-    console_get_errors: async ({ tab_id, frame_id }, ctx) => {
+    console_get_errors: async ({ tab_id, frame_id, since }, ctx) => {
       const tab = ctx.resolveTab(tab_id);
       const actor = getActorForTab(tab, frame_id);
-      return await actor.sendQuery('ZenLeapAgent:GetConsoleErrors');
+      return await actor.sendQuery('ZenLeapAgent:GetConsoleErrors', { since });
     },
 
     console_evaluate: async ({ tab_id, frame_id, expression }, ctx) => {
@@ -1706,11 +1785,23 @@
       return { found: false, timeout: true };
     },
 
-    wait_for_load: async ({ tab_id, timeout = 15 }, ctx) => {
+    wait_for_load: async ({ tab_id, timeout = 15, require_navigation_after }, ctx) => {
       const tab = ctx.resolveTab(tab_id);
       if (!tab) throw new Error('Tab not found');
       const browser = tab.linkedBrowser;
       const deadline = Date.now() + timeout * 1000;
+      if (require_navigation_after !== undefined) {
+        // Don't mistake the previous page's settled state for the next
+        // load finishing: navigate defers its loadURI to a macrotask, so
+        // a wait issued right behind it can run its first isLoadingDocument
+        // check before the load starts. Hold until a navigation has begun
+        // past the caller-supplied counter (from get_navigation_status or
+        // a prior wait_for_load).
+        while (((navStatusMap.get(browser) || {}).navCount || 0) <= require_navigation_after
+               && Date.now() < deadline) {
+          await new Promise(r => setTimeout(r, 50));
+        }
+      }
       while (browser.webProgress?.isLoadingDocument && Date.now() < deadline) {
         await new Promise(r => setTimeout(r, 200));
       }
@@ -1721,6 +1812,7 @@
         title: tab.label || '',
         loading: browser.webProgress?.isLoadingDocument || false,
         http_status: navEntry.httpStatus || 0,
+        nav_count: navEntry.navCount || 0,
       };
     },
 
@@ -1846,8 +1938,11 @@
       return { success: true, note: 'Network monitoring stopped' };
     },
 
-    network_get_log: async ({ url_filter, method_filter, status_filter, limit }) => {
-      let entries = [...networkLog];
+    network_get_log: async ({ url_filter, method_filter, status_filter, limit, since_seq }) => {
+      let entries = getNetworkEntries();
+      if (since_seq) {
+        entries = entries.filter(e => e.seq > since_seq);
+      }
       if (url_filter) {
         const re = new RegExp(url_filter, 'i');
         entries = entries.filter(e => re.test(e.url));
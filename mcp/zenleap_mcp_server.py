@@ -6,13 +6,59 @@ Connects to the Zen AI Agent WebSocket server running in the browser.
 """
 
 import asyncio
-import base64
+import binascii
+import functools
 import json
 import os
+import string
 from uuid import uuid4
 
 import websockets
 
+try:
+    # Optional: much better fuzzy matching for visual grounding when installed.
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = None
+    process = None
+else:
+    try:
+        # process.cdist returns its score matrix as a numpy array; fall
+        # back to per-element scoring when numpy isn't around.
+        import numpy  # noqa: F401
+    except ImportError:
+        process = None
+
+try:
+    # Optional: ~2-3x faster JSON encode/decode on the command hot path.
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: single-pass multi-word matching for element scoring on
+    # large DOMs (only used when rapidfuzz is unavailable).
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+if orjson is not None:
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    def _json_dumps_indent(obj, default=None) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=default).decode()
+
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj)
+
+    def _json_dumps_indent(obj, default=None) -> str:
+        return json.dumps(obj, indent=2, default=default)
+
+    _json_loads = json.loads
+
 from mcp.server.fastmcp import FastMCP
 from mcp.server.fastmcp.utilities.types import Image
 
@@ -27,11 +73,21 @@ mcp = FastMCP(
     ),
 )
 
+# Shared sentinel for no-params commands — never mutated, only serialized
+_EMPTY_PARAMS: dict = {}
+
 _ws_connection = None
 _ws_lock = asyncio.Lock()
-_ws_command_lock = asyncio.Lock()
+_ws_send_lock = asyncio.Lock()  # Serializes frame writes only, not round trips
 _session_id: str | None = None  # Populated from X-ZenLeap-Session after connect
 
+# In-flight requests keyed by message id, resolved by the reader task.
+# Insertion-ordered, so the oldest pending request is the first key.
+_pending: dict[str, asyncio.Future] = {}
+_demand = asyncio.Event()  # Set while any request is pending; gates recv()
+_reader_task: asyncio.Task | None = None
+_reader_ws = None  # Connection the reader task is draining
+
 
 async def get_ws():
     """Get or create WebSocket connection to browser.
@@ -43,6 +99,16 @@ async def get_ws():
     This prevents tab loss when the WebSocket connection drops mid-operation.
     """
     global _ws_connection, _session_id
+    # Fast path: a live cached connection needs no lock — concurrent
+    # callers can all take it without queueing behind _ws_lock, which
+    # only matters for the connect/reconnect slow path below.
+    ws = _ws_connection
+    if ws is not None:
+        try:
+            await ws.ping()
+            return ws
+        except Exception:
+            pass  # dead connection — fall through to the locked path
     async with _ws_lock:
         if _ws_connection is not None:
             try:
@@ -98,44 +164,113 @@ async def get_ws():
         return _ws_connection
 
 
+def _ensure_reader(ws) -> None:
+    """Start (or restart) the response reader for the given connection.
+    A stale reader from a previous connection is cancelled so it cannot
+    fail futures registered against the new one."""
+    global _reader_task, _reader_ws
+    if _reader_task is not None and not _reader_task.done() and _reader_ws is ws:
+        return
+    if _reader_task is not None and not _reader_task.done():
+        _reader_task.cancel()
+    _reader_ws = ws
+    _reader_task = asyncio.get_running_loop().create_task(_read_responses(ws))
+
+
+async def _read_responses(ws) -> None:
+    """Sole recv() loop: route each response to its waiting future by
+    message id, so independent tool calls can be in flight concurrently
+    over the one socket. A response whose id has no waiter goes to the
+    oldest pending request — the only sensible order against a server
+    that doesn't echo ids, and the pre-multiplexing FIFO behavior.
+    On a connection-level error, every pending request is failed so its
+    caller can run the reconnect-and-retry path.
+
+    recv() is demand-gated: the loop sleeps until a request is pending.
+    The browser only sends frames in response to requests, so reading
+    with nothing in flight could only race a response queued for a
+    caller that has not registered its future yet."""
+    try:
+        while True:
+            if not _pending:
+                _demand.clear()
+                await _demand.wait()
+            resp = _json_loads(await ws.recv())
+            fut = _pending.pop(resp.get("id"), None)
+            if fut is None and _pending:
+                fut = _pending.pop(next(iter(_pending)))
+            if fut is not None and not fut.done():
+                fut.set_result(resp)
+    except Exception as exc:
+        for fut in _pending.values():
+            if not fut.done():
+                fut.set_exception(exc)
+        _pending.clear()
+
+
 async def browser_command(method: str, params: dict | None = None) -> dict:
     """Send a command to the browser and return the response.
 
+    Concurrent calls pipeline over the shared connection: only the frame
+    write is serialized (via _ws_send_lock); each caller then awaits its
+    own response future instead of holding the socket for the whole
+    round trip.
+
     Retries once on connection-level failure (reconnects to same session).
     Browser-level errors (e.g. "Tab not found") are never retried.
     """
     global _ws_connection
-    async with _ws_command_lock:
-        for attempt in range(2):
-            try:
+    for attempt in range(2):
+        msg_id = str(uuid4())
+        try:
+            async with _ws_send_lock:
                 ws = await get_ws()
-                msg_id = str(uuid4())
-                msg = {"id": msg_id, "method": method, "params": params or {}}
-                await ws.send(json.dumps(msg))
-                raw = await asyncio.wait_for(ws.recv(), timeout=120)
-            except Exception:
-                # Connection-level error (send/recv failed, timeout, etc.)
-                if attempt == 0:
-                    old_ws = _ws_connection
-                    _ws_connection = None
-                    if old_ws is not None:
-                        try:
-                            await old_ws.close()
-                        except Exception:
-                            pass
-                    continue  # retry with reconnection
-                raise
-            resp = json.loads(raw)
-            if "error" in resp:
-                raise Exception(resp["error"].get("message", "Unknown browser error"))
-            return resp.get("result", {})
+                _ensure_reader(ws)
+                fut = asyncio.get_running_loop().create_future()
+                _pending[msg_id] = fut
+                _demand.set()
+                msg = {"id": msg_id, "method": method, "params": params or _EMPTY_PARAMS}
+                await ws.send(_json_dumps(msg))
+            resp = await asyncio.wait_for(fut, timeout=120)
+        except Exception:
+            # Connection-level error (send failed, reader died, timeout)
+            _pending.pop(msg_id, None)
+            if attempt == 0:
+                old_ws = _ws_connection
+                _ws_connection = None
+                if old_ws is not None:
+                    try:
+                        await old_ws.close()
+                    except Exception:
+                        pass
+                continue  # retry with reconnection
+            raise
+        if "error" in resp:
+            raise Exception(resp["error"].get("message", "Unknown browser error"))
+        return resp.get("result", {})
     raise RuntimeError("browser_command: unreachable")
 
 
+def decode_data_url(data_url: str) -> tuple[bytes, str]:
+    """Decode a base64 image data URL into (raw_bytes, format).
+
+    Screenshots can be several MB; find+slice avoids str.split's extra
+    allocation and a2b_base64 skips b64decode's validation wrapper."""
+    comma = data_url.find(",")
+    if data_url.startswith("data:") and comma != -1:
+        header = data_url[:comma]
+        b64 = data_url[comma + 1:]
+        fmt = "jpeg" if "jpeg" in header else "png"
+    else:
+        b64 = data_url
+        fmt = "jpeg"
+    return binascii.a2b_base64(b64), fmt
+
+
 def text_result(data) -> str:
     """Format result as string for MCP tool return."""
     if isinstance(data, (dict, list)):
-        return json.dumps(data, indent=2)
+        return _json_dumps_indent(data)
     return str(data)
 
 
@@ -280,15 +415,7 @@ async def browser_screenshot(tab_id: str = "") -> Image:
     """Take a screenshot of a browser tab. Returns the image so you can see the page.
     Use this to verify page state, understand layouts, or see visual content."""
     result = await browser_command("screenshot", {"tab_id": tab_id or None})
-    data_url = result.get("image", "")
-    # Strip data URL prefix: "data:image/jpeg;base64,..." or "data:image/png;base64,..."
-    if data_url.startswith("data:"):
-        header, b64 = data_url.split(",", 1)
-        fmt = "jpeg" if "jpeg" in header else "png"
-    else:
-        b64 = data_url
-        fmt = "jpeg"
-    raw_bytes = base64.b64decode(b64)
+    raw_bytes, fmt = decode_data_url(result.get("image", ""))
     return Image(data=raw_bytes, format=fmt)
 
 
@@ -423,6 +550,12 @@ async def browser_get_elements_compact(
     return text_result(result)
 
 
+# Pre-multiplied indent strings for the AX-tree formatter: trees have
+# thousands of nodes but shallow depths, so the per-node "  " * depth
+# allocation becomes a table lookup.
+_AX_INDENTS = tuple("  " * i for i in range(32))
+
+
 @mcp.tool()
 async def browser_get_accessibility_tree(tab_id: str = "", frame_id: int = 0) -> str:
     """Get the accessibility tree for the current page.
@@ -441,7 +574,8 @@ async def browser_get_accessibility_tree(tab_id: str = "", frame_id: int = 0) ->
             return "(no accessibility nodes found)"
         lines = [f"Accessibility tree ({result.get('total', len(nodes))} nodes):"]
         for node in nodes:
-            indent = "  " * node.get("depth", 0)
+            depth = node.get("depth", 0)
+            indent = _AX_INDENTS[depth] if depth < 32 else "  " * depth
             role = node.get("role", "?")
             name = node.get("name", "")
             value = node.get("value", "")
@@ -703,12 +837,7 @@ async def browser_save_screenshot(file_path: str, tab_id: str = "") -> str:
     Use this to save visual evidence of page state to disk.
     The file_path can be absolute or relative to the server's working directory."""
     result = await browser_command("screenshot", {"tab_id": tab_id or None})
-    data_url = result.get("image", "")
-    if data_url.startswith("data:"):
-        b64 = data_url.split(",", 1)[1]
-    else:
-        b64 = data_url
-    raw = base64.b64decode(b64)
+    raw, _ = decode_data_url(result.get("image", ""))
     # Ensure parent directory exists
     parent = os.path.dirname(os.path.abspath(file_path))
     os.makedirs(parent, exist_ok=True)
@@ -850,10 +979,13 @@ async def browser_network_get_log(
     method_filter: str = "",
     status_filter: int = 0,
     limit: int = 50,
+    since_seq: int = 0,
 ) -> str:
     """Get captured network log entries. Filters are optional.
     url_filter: regex to match URLs. method_filter: GET/POST/etc.
-    status_filter: HTTP status code (e.g. 404). limit: max entries to return."""
+    status_filter: HTTP status code (e.g. 404). limit: max entries to return.
+    since_seq: only return entries newer than this sequence number — use the
+    #N prefix from a previous call as a cursor to fetch incrementally."""
     params: dict = {"limit": limit}
     if url_filter:
         params["url_filter"] = url_filter
@@ -861,26 +993,36 @@ async def browser_network_get_log(
         params["method_filter"] = method_filter
     if status_filter:
         params["status_filter"] = status_filter
+    if since_seq:
+        params["since_seq"] = since_seq
     result = await browser_command("network_get_log", params)
     if isinstance(result, list):
         if not result:
             return "(no network entries captured)"
-        lines = []
-        for entry in result:
-            status = entry.get("status", "")
-            status_str = f" [{status}]" if status else ""
-            ct = entry.get("content_type", "")
-            ct_str = f" ({ct})" if ct else ""
-            lines.append(
-                f"{entry.get('method', '?')} {entry.get('url', '?')}{status_str}{ct_str}"
+        # Single generator pass — the log buffer can hold 500 entries
+        return "\n".join(
+            "{}{} {}{}{}".format(
+                f"#{e['seq']} " if e.get("seq") else "",
+                e.get("method", "?"),
+                e.get("url", "?"),
+                f" [{e['status']}]" if e.get("status") else "",
+                f" ({e['content_type']})" if e.get("content_type") else "",
             )
-        return "\n".join(lines)
+            for e in result
+        )
     return text_result(result)
 
 
 # ── Request Interception (Phase 7) ────────────────────────────
 
 
+@functools.lru_cache(maxsize=64)
+def _parse_headers(headers: str) -> dict:
+    """Parse a JSON header string, cached — callers often repeat the same
+    header set across many rules. The dict is shared; do not mutate it."""
+    return _json_loads(headers)
+
+
 @mcp.tool()
 async def browser_intercept_add_rule(
     pattern: str, action: str, headers: str = ""
@@ -890,7 +1032,7 @@ async def browser_intercept_add_rule(
     headers: JSON object of headers to set (only for modify_headers action)."""
     params: dict = {"pattern": pattern, "action": action}
     if headers:
-        params["headers"] = json.loads(headers)
+        params["headers"] = _parse_headers(headers)
     return text_result(await browser_command("intercept_add_rule", params))
 
 
@@ -930,12 +1072,19 @@ async def browser_session_restore(file_path: str) -> str:
 # ── Multi-Tab Coordination (Phase 9) ──────────────────────────
 
 
+def _split_csv(value: str) -> list[str]:
+    """Split a comma-separated argument into stripped, non-empty tokens.
+    Validation runs on this before any WebSocket traffic, so malformed
+    input never costs a round trip."""
+    return [t for t in map(str.strip, value.split(",")) if t]
+
+
 @mcp.tool()
 async def browser_compare_tabs(tab_ids: str) -> str:
     """Compare content across multiple tabs. Pass comma-separated tab IDs.
     Returns URL, title, and text preview (500 chars) for each tab.
     Useful for comparing search results, A/B testing, or verifying data across pages."""
-    ids = [t.strip() for t in tab_ids.split(",") if t.strip()]
+    ids = _split_csv(tab_ids)
     if len(ids) < 2:
         return "Error: provide at least 2 comma-separated tab IDs"
     return text_result(await browser_command("compare_tabs", {"tab_ids": ids}))
@@ -947,7 +1096,7 @@ async def browser_batch_navigate(urls: str, persist: bool = False) -> str:
     All tabs are created in the Zen AI Agent workspace.
     Returns the tab IDs for all opened tabs.
     Set persist=true to keep all tabs alive after session close."""
-    url_list = [u.strip() for u in urls.split(",") if u.strip()]
+    url_list = _split_csv(urls)
     if not url_list:
         return "Error: provide at least 1 URL"
     return text_result(await browser_command("batch_navigate", {"urls": url_list, "persist": persist}))
@@ -955,6 +1104,91 @@ async def browser_batch_navigate(urls: str, persist: bool = False) -> str:
 
 # ── Visual Grounding (Phase 9) ────────────────────────────────
 
+_PUNCT_TABLE = str.maketrans("", "", string.punctuation)
+
+
+class _DomSoA:
+    """Structure-of-arrays view of a DOM snapshot for scoring: one
+    pre-lowered searchable string per element, parallel to `elements`.
+    Built once per snapshot so repeated queries skip the per-element
+    attribute lookups and .lower() calls."""
+
+    __slots__ = ("elements", "combined_lower")
+
+    def __init__(self, elements: list):
+        self.elements = elements
+        combined = []
+        for el in elements:
+            attrs = el.get("attributes") or {}
+            text = (el.get("text") or "").lower()
+            # aria-label is already in text via #getVisibleText
+            combined.append(
+                " ".join(
+                    (
+                        text,
+                        el.get("tag", "").lower(),
+                        (el.get("role") or "").lower(),
+                        (attrs.get("href") or "").lower(),
+                        (attrs.get("name") or "").lower(),
+                        (attrs.get("type") or "").lower(),
+                        text,
+                    )
+                )
+            )
+        self.combined_lower = combined
+
+
+_soa_cache: dict = {}
+_SOA_CACHE_MAX = 8
+
+
+def _dom_soa(result: dict) -> _DomSoA:
+    """Get the SoA form of a get_dom result, cached by a cheap snapshot
+    fingerprint (url/title/element count plus first and last element).
+    A full equality check on the element list guards against collisions."""
+    elements = result["elements"]
+    key = (
+        result.get("url", ""),
+        result.get("title", ""),
+        len(elements),
+        _json_dumps(elements[0]) if elements else "",
+        _json_dumps(elements[-1]) if elements else "",
+    )
+    soa = _soa_cache.get(key)
+    if soa is None or soa.elements != elements:
+        soa = _DomSoA(elements)
+        if len(_soa_cache) >= _SOA_CACHE_MAX:
+            _soa_cache.clear()
+        _soa_cache[key] = soa
+    return soa
+
+
+@functools.lru_cache(maxsize=64)
+def _word_automaton(words: tuple):
+    """Build an Aho-Corasick automaton matching all search words in one
+    pass over each element string — O(len(s)) instead of O(len(s)·|words|).
+    Cached per word tuple; only called when ahocorasick is installed."""
+    automaton = ahocorasick.Automaton()
+    for i, w in enumerate(words):
+        automaton.add_word(w, i)
+    automaton.make_automaton()
+    return automaton
+
+
+@functools.lru_cache(maxsize=256)
+def _description_tokens(description: str) -> tuple:
+    """Tokenize a description into unique lowercase search words, cached —
+    agents often repeat the same query across a reflection loop.
+    Strips punctuation and drops words shorter than 2 characters."""
+    words = {w.translate(_PUNCT_TABLE) for w in description.lower().split()}
+    return tuple(w for w in words if len(w) > 1)
+
+
+# WRatio scores nearly any string pair above zero (unrelated text still
+# lands in the 30s), so fuzzy scores below this floor are noise, not
+# matches — without it "No elements match" could never trigger.
+_FUZZY_SCORE_CUTOFF = 50
+
 
 @mcp.tool()
 async def browser_find_element_by_description(
@@ -975,27 +1209,48 @@ async def browser_find_element_by_description(
     if not elements:
         return "(no interactive elements found)"
 
-    # Tokenize description into search words
-    words = [w.lower() for w in description.split() if len(w) > 1]
+    # Tokenize description into search words (cached across repeated queries)
+    words = _description_tokens(description)
     if not words:
         return "Error: description is empty"
 
-    # Score each element by how many description words match
-    scored = []
-    for el in elements:
-        text = (el.get("text") or "").lower()
-        tag = el.get("tag", "").lower()
-        role = (el.get("role") or "").lower()
-        attrs = el.get("attributes") or {}
-        href = (attrs.get("href") or "").lower()
-        name = (attrs.get("name") or "").lower()
-        etype = (attrs.get("type") or "").lower()
-        aria = text  # aria-label is already in text via #getVisibleText
-
-        searchable = f"{text} {tag} {role} {href} {name} {etype} {aria}"
-        score = sum(1 for w in words if w in searchable)
-        if score > 0:
-            scored.append((score, el))
+    # Score each element by how many description words match.
+    # The pre-lowered SoA strings are cached across queries on the same DOM.
+    soa = _dom_soa(result)
+    desc_lower = description.lower()
+    if process is not None:
+        # One C-level batch call scores the query against every element
+        # at once (bit-parallel Levenshtein, GIL released across worker
+        # threads) instead of a Python-level WRatio call per element.
+        # score_cutoff zeroes sub-floor pairs inside the C loop (and lets
+        # it exit early), keeping this path's results identical to the
+        # per-element WRatio branch.
+        scores = process.cdist(
+            (desc_lower,), soa.combined_lower, scorer=fuzz.WRatio,
+            score_cutoff=_FUZZY_SCORE_CUTOFF, workers=-1,
+        )[0]
+        scored = [
+            (int(s), el)
+            for s, el in zip(scores, elements)
+            if s >= _FUZZY_SCORE_CUTOFF
+        ]
+    else:
+        automaton = _word_automaton(words) if fuzz is None and ahocorasick is not None else None
+        scored = []
+        for el, searchable in zip(elements, soa.combined_lower):
+            if fuzz is not None:
+                # Fuzzy scoring tolerates near-misses ("login" vs "Log In")
+                score = int(fuzz.WRatio(desc_lower, searchable))
+                if score < _FUZZY_SCORE_CUTOFF:
+                    score = 0  # below WRatio's noise floor
+            elif automaton is not None:
+                # Single scan finds all words at once on large attribute values
+                matched = {i for _, i in automaton.iter(searchable)}
+                score = 100 * len(matched) // len(words)
+            else:
+                score = 100 * sum(1 for w in words if w in searchable) // len(words)
+            if score > 0:
+                scored.append((score, el))
 
     scored.sort(key=lambda x: x[0], reverse=True)
     top = scored[:5]
@@ -1015,7 +1270,7 @@ async def browser_find_element_by_description(
         tag = el["tag"]
         role_str = f" role={el['role']}" if el.get("role") else ""
         lines.append(
-            f"  [{el['index']}] <{tag}{role_str}>{text}</{tag}>{detail} (score: {score}/{len(words)})"
+            f"  [{el['index']}] <{tag}{role_str}>{text}</{tag}>{detail} (score: {score}/100)"
         )
     return "\n".join(lines)
 
@@ -1109,47 +1364,51 @@ async def browser_eval_chrome(expression: str) -> str:
     if "error" in result:
         stack = result.get("stack", "")
         return f"Error: {result['error']}" + (f"\n{stack}" if stack else "")
-    return json.dumps(result.get("result"), indent=2, default=str)
+    return _json_dumps_indent(result.get("result"), default=str)
 
 
 # ── Reflection (Phase 10) ─────────────────────────────────────
 
 
 @mcp.tool()
-async def browser_reflect(goal: str = "", tab_id: str = "") -> list:
+async def browser_reflect(
+    goal: str = "", tab_id: str = "", include_text: bool = True, text_limit: int = 50000
+) -> list:
     """Get a comprehensive snapshot of the current page for reasoning.
     Returns a screenshot (as an image) plus page text and metadata.
     Use this to understand the full page state before making decisions.
-    goal: optional description of what you're trying to accomplish."""
-    # 1. Screenshot
-    screenshot_result = await browser_command("screenshot", {"tab_id": tab_id or None})
-    # 2. Page text
-    text_result_data = await browser_command("get_page_text", {"tab_id": tab_id or None})
-    # 3. Page info
-    info_result = await browser_command("get_page_info", {"tab_id": tab_id or None})
+    goal: optional description of what you're trying to accomplish.
+    include_text: set to false to skip the page text when only the screenshot matters.
+    text_limit: max characters of page text to include (default 50000)."""
+    # Screenshot, page text, and page info fused into one round-trip: the
+    # browser-side "reflect" opcode gathers all three and replies once.
+    result = await browser_command(
+        "reflect",
+        {
+            "tab_id": tab_id or None,
+            "include_text": include_text,
+            "text_limit": text_limit,
+        },
+    )
 
     blocks = []
 
     # Add screenshot as Image block
-    data_url = screenshot_result.get("image", "")
+    data_url = result.get("image", "")
     if data_url:
-        if data_url.startswith("data:"):
-            header, b64 = data_url.split(",", 1)
-            fmt = "jpeg" if "jpeg" in header else "png"
-        else:
-            b64 = data_url
-            fmt = "jpeg"
-        raw_bytes = base64.b64decode(b64)
+        raw_bytes, fmt = decode_data_url(data_url)
         blocks.append(Image(data=raw_bytes, format=fmt))
 
     # Add text summary
-    summary = f"URL: {info_result.get('url', '?')}\n"
-    summary += f"Title: {info_result.get('title', '?')}\n"
-    summary += f"Loading: {info_result.get('loading', False)}\n"
+    summary = f"URL: {result.get('url', '?')}\n"
+    summary += f"Title: {result.get('title', '?')}\n"
+    summary += f"Loading: {result.get('loading', False)}\n"
     if goal:
         summary += f"\nGoal: {goal}\n"
-    page_text = (text_result_data.get("text") or "")[:50000]
-    summary += f"\n--- Page Text (first 50K chars) ---\n{page_text}"
+    if include_text:
+        # [:text_limit] is a safety net for browsers that ignore text_limit
+        page_text = (result.get("text") or "")[:text_limit]
+        summary += f"\n--- Page Text (first {text_limit} chars) ---\n{page_text}"
     blocks.append(summary)
 
     return blocks
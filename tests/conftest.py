@@ -0,0 +1,28 @@
+"""Shared pytest configuration for the MCP server tests."""
+
+import pytest
+
+import zenleap_mcp_server as server
+
+try:
+    # Optional, same pattern as the server's orjson import: uvloop's
+    # C-implemented loop cuts task/future dispatch cost across the
+    # asyncio-heavy suite. The stdlib loop is used when absent.
+    import uvloop
+
+    uvloop.install()
+except ImportError:
+    pass
+
+
+@pytest.fixture(autouse=True)
+def _reset_ws_state():
+    """Reset the server's module-level connection state around every test,
+    so tests that mutate it (get_ws, session routing, error paths) can't
+    leak a stale fake into a neighbor. Two attribute writes each way —
+    cheaper than remembering inline resets per test."""
+    server._ws_connection = None
+    server._session_id = None
+    yield
+    server._ws_connection = None
+    server._session_id = None
@@ -0,0 +1,227 @@
+"""Shared WebSocket client for the e2e phase tests.
+
+Multiplexes commands over one connection: a background reader task
+dispatches responses to per-id futures, so independent commands can be
+pipelined (sent before earlier replies arrive) instead of paying a full
+round-trip each.
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import sys
+from dataclasses import dataclass, field
+
+import websockets
+
+try:
+    # Optional: 3-10x faster JSON on the send/recv hot path. dumps()
+    # returns bytes, which go out as a binary WS frame (the agent treats
+    # binary frames as UTF-8 JSON too).
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    # Bind one encoder/decoder instance instead of the json.dumps/loads
+    # wrappers, which rebuild scanner and encoder state on every call.
+    # Compact separators also drop the spaces from bytes-on-wire.
+    _dumps = json.JSONEncoder(separators=(",", ":")).encode
+    _decode = json.JSONDecoder().decode
+
+    def _loads(raw):
+        # JSONDecoder.decode only takes str; the agent replies with
+        # binary frames, so recv() hands us bytes.
+        return _decode(raw.decode() if isinstance(raw, bytes) else raw)
+
+try:
+    # Optional: uvloop cuts asyncio scheduling overhead 2-4x; the
+    # websockets client benefits transparently. Stdlib loop otherwise.
+    import uvloop
+
+    run = uvloop.run
+except ImportError:
+    run = asyncio.run
+
+WS_URL = "ws://localhost:9876"
+MAX_SIZE = 10 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=128)
+def _envelope_tail(method: str, params_key: tuple) -> bytes:
+    """Serialized method+params fragment (without the opening brace) for
+    commands whose params are constant — ping, wait_for_load, the repeated
+    scrolls, etc. Cached so the encoder runs once per distinct command."""
+    raw = _dumps({"method": method, "params": dict(params_key)})
+    if isinstance(raw, str):
+        raw = raw.encode()
+    return raw[1:]
+
+
+def _encode_envelope(msg_id: str, method: str, params) -> bytes:
+    """Encode one command envelope, splicing the per-call id in front of a
+    cached method+params tail when the params are hashable. Falls back to
+    a full serialization for nested (unhashable) params."""
+    try:
+        tail = _envelope_tail(method, tuple(sorted(params.items())) if params else ())
+    except TypeError:
+        raw = _dumps({"id": msg_id, "method": method, "params": params or {}})
+        return raw.encode() if isinstance(raw, str) else raw
+    return b'{"id":"' + msg_id.encode() + b'",' + tail
+
+
+@dataclass
+class Results:
+    """Pass/fail counters for a phase run, replacing per-file globals.
+
+    With buffered=True, check lines accumulate in memory and flush()
+    writes them in one syscall — dozens of per-assertion writes collapse
+    to one per phase section. Unbuffered (the default) writes each line
+    immediately, which phases that interleave their own prints rely on.
+    """
+
+    passed: int = 0
+    failed: int = 0
+    buffered: bool = False
+    _lines: list = field(default_factory=list)
+
+    def check(self, name, condition, detail=""):
+        if condition:
+            self.passed += 1
+            line = f"  ✓ {name}\n"
+        else:
+            self.failed += 1
+            line = f"  ✗ {name} — {detail}\n"
+        if self.buffered:
+            self._lines.append(line)
+        else:
+            sys.stdout.write(line)
+        return condition
+
+    def flush(self):
+        """Emit buffered check lines in a single write."""
+        if self._lines:
+            sys.stdout.write("".join(self._lines))
+            self._lines.clear()
+
+    @property
+    def total(self):
+        return self.passed + self.failed
+
+
+async def assert_server(client, results, expected_version):
+    """Ping the server and verify the protocol version (shared by every
+    phase file; the session runner calls it just once per connection)."""
+    r = await client.call("ping")
+    results.check("pong received", r.get("pong") is True)
+    results.check(
+        f"version is {expected_version}",
+        r.get("version") == expected_version,
+        f"got {r.get('version')}",
+    )
+
+
+class WSClient:
+    """Pipelined command client over a single WebSocket connection."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._pending: dict = {}
+        # Small monotonic ids instead of uuid4: no urandom read per
+        # command and ~35 fewer bytes per JSON envelope.
+        self._next_id = itertools.count(1).__next__
+        self._reader = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, url=WS_URL):
+        # compression=None: the agent lives on loopback, where
+        # permessage-deflate is pure CPU overhead on the multi-MB
+        # get_dom/screenshot payloads (and the agent's hand-rolled WS
+        # server never negotiates the extension anyway).
+        # Queue/buffer limits are tuned for this traffic profile: bursts
+        # of small pipelined commands (replay, batched cleanup) that the
+        # default max_queue could stall on, plus occasional multi-MB
+        # responses that benefit from a 1MB outgoing buffer.
+        return cls(
+            await websockets.connect(
+                url,
+                max_size=MAX_SIZE,
+                compression=None,
+                max_queue=256,
+                write_limit=2**20,
+            )
+        )
+
+    async def _read_loop(self):
+        """Dispatch incoming responses to their waiting futures by message ID.
+        Batched replies arrive as a JSON array; each element is routed
+        individually."""
+        try:
+            async for raw in self.ws:
+                resp = _loads(raw)
+                for item in resp if isinstance(resp, list) else (resp,):
+                    fut = self._pending.pop(item.get("id"), None)
+                    if fut is not None and not fut.done():
+                        fut.set_result(item)
+        except Exception as e:
+            for fut in self._pending.values():
+                if not fut.done():
+                    fut.set_exception(ConnectionError(f"connection lost: {e}"))
+            self._pending.clear()
+
+    async def call(self, method, params=None, timeout=30):
+        """Issue one command. timeout=None skips the per-call
+        asyncio.wait_for (a Timeout allocation + callback registration per
+        command) for callers that enforce a single outer deadline."""
+        msg_id = str(self._next_id())
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = fut
+        try:
+            await self.ws.send(_encode_envelope(msg_id, method, params))
+            resp = await fut if timeout is None else await asyncio.wait_for(fut, timeout=timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+        if "error" in resp:
+            raise Exception(f"{method} error: {resp['error'].get('message', resp['error'])}")
+        return resp.get("result", {})
+
+    def send_many(self, calls):
+        """Fire a batch of independent (method, params) commands concurrently.
+        Returns an awaitable yielding results in order."""
+        return asyncio.gather(*(self.call(method, params) for method, params in calls))
+
+    async def send_batch(self, calls, timeout=30):
+        """Send independent (method, params) commands as one JSON array frame.
+        The server handles the envelopes concurrently and replies with a
+        single array — one WS frame each way instead of one per command.
+        Falls back to per-message pipelining against servers that don't
+        answer array frames."""
+        loop = asyncio.get_running_loop()
+        envelopes = []
+        futures = []
+        for method, params in calls:
+            msg_id = str(self._next_id())
+            envelopes.append({"id": msg_id, "method": method, "params": params or {}})
+            fut = loop.create_future()
+            self._pending[msg_id] = fut
+            futures.append(fut)
+        try:
+            await self.ws.send(_dumps(envelopes))
+            gathered = asyncio.gather(*futures)
+            resps = await gathered if timeout is None else await asyncio.wait_for(gathered, timeout=timeout)
+        except asyncio.TimeoutError:
+            return await self.send_many((e["method"], e["params"]) for e in envelopes)
+        finally:
+            for env in envelopes:
+                self._pending.pop(env["id"], None)
+        results = []
+        for env, resp in zip(envelopes, resps):
+            if "error" in resp:
+                raise Exception(f"{env['method']} error: {resp['error'].get('message', resp['error'])}")
+            results.append(resp.get("result", {}))
+        return results
+
+    async def close(self):
+        self._reader.cancel()
+        await self.ws.close()
@@ -3,8 +3,8 @@ Requires Zen Browser running with ZenLeap Agent v1.0.0.
 """
 
 import asyncio
+import itertools
 import json
-from uuid import uuid4
 
 import websockets
 
@@ -12,12 +12,37 @@ WS_URL = "ws://localhost:9876"
 PASS = 0
 FAIL = 0
 
+# In-flight commands keyed by message ID, resolved by the recv_loop task.
+# Lets independent commands be pipelined (sent before earlier replies arrive).
+_pending: dict = {}
+# Monotonic ids: cheaper than uuid4 and smaller on the wire.
+_next_id = itertools.count(1).__next__
+
+
+async def recv_loop(ws):
+    """Dispatch incoming responses to their waiting futures by message ID."""
+    try:
+        async for raw in ws:
+            resp = json.loads(raw)
+            fut = _pending.pop(resp.get("id"), None)
+            if fut is not None and not fut.done():
+                fut.set_result(resp)
+    except Exception as e:
+        for fut in _pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"connection lost: {e}"))
+        _pending.clear()
+
 
 async def cmd(ws, method, params=None):
-    msg_id = str(uuid4())
-    await ws.send(json.dumps({"id": msg_id, "method": method, "params": params or {}}))
-    raw = await asyncio.wait_for(ws.recv(), timeout=30)
-    resp = json.loads(raw)
+    msg_id = str(_next_id())
+    fut = asyncio.get_running_loop().create_future()
+    _pending[msg_id] = fut
+    try:
+        await ws.send(json.dumps({"id": msg_id, "method": method, "params": params or {}}))
+        resp = await asyncio.wait_for(fut, timeout=30)
+    finally:
+        _pending.pop(msg_id, None)
     if "error" in resp:
         raise Exception(f"{method} failed: {resp['error']}")
     return resp.get("result", {})
@@ -38,6 +63,7 @@ async def main():
     global PASS, FAIL
 
     ws = await websockets.connect(WS_URL, max_size=10 * 1024 * 1024)
+    reader = asyncio.create_task(recv_loop(ws))
 
     try:
         # ── 10.1: Chrome-Context Eval ────────────────────
@@ -89,17 +115,15 @@ async def main():
         await asyncio.sleep(2)
         await cmd(ws, "wait_for_load", {"tab_id": tab_id, "timeout": 10})
 
-        # Screenshot
-        screenshot = await cmd(ws, "screenshot", {"tab_id": tab_id})
+        # Screenshot + page text + page info are independent — pipeline them
+        screenshot, text, info = await asyncio.gather(
+            cmd(ws, "screenshot", {"tab_id": tab_id}),
+            cmd(ws, "get_page_text", {"tab_id": tab_id}),
+            cmd(ws, "get_page_info", {"tab_id": tab_id}),
+        )
         check("Screenshot returns image", bool(screenshot.get("image")))
-
-        # Page text
-        text = await cmd(ws, "get_page_text", {"tab_id": tab_id})
         check("Page text contains content", len(text.get("text", "")) > 0, f"len={len(text.get('text', ''))}")
         check("Page text has Example Domain", "Example Domain" in text.get("text", ""))
-
-        # Page info
-        info = await cmd(ws, "get_page_info", {"tab_id": tab_id})
         check("Page info has URL", "example.com" in info.get("url", ""))
         check("Page info has title", bool(info.get("title")))
 
@@ -110,6 +134,7 @@ async def main():
         print(f"\n  [ERROR] {e}")
         FAIL += 1
     finally:
+        reader.cancel()
         await ws.close()
 
     print(f"\n{'='*50}")
@@ -3,10 +3,10 @@
 
 import asyncio
 import base64
+import itertools
 import json
 import sys
 import time
-from uuid import uuid4
 
 import websockets
 
@@ -14,13 +14,38 @@ WS_URL = "ws://localhost:9876"
 PASS = 0
 FAIL = 0
 
+# In-flight commands keyed by message ID, resolved by the recv_loop task.
+# Lets independent commands be pipelined (sent before earlier replies arrive).
+_pending: dict = {}
+# Monotonic ids: cheaper than uuid4 and smaller on the wire.
+_next_id = itertools.count(1).__next__
+
+
+async def recv_loop(ws):
+    """Dispatch incoming responses to their waiting futures by message ID."""
+    try:
+        async for raw in ws:
+            resp = json.loads(raw)
+            fut = _pending.pop(resp.get("id"), None)
+            if fut is not None and not fut.done():
+                fut.set_result(resp)
+    except Exception as e:
+        for fut in _pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"connection lost: {e}"))
+        _pending.clear()
+
 
 async def send_command(ws, method, params=None, timeout=30):
-    msg_id = str(uuid4())
+    msg_id = str(_next_id())
     msg = {"id": msg_id, "method": method, "params": params or {}}
-    await ws.send(json.dumps(msg))
-    raw = await asyncio.wait_for(ws.recv(), timeout=timeout)
-    resp = json.loads(raw)
+    fut = asyncio.get_running_loop().create_future()
+    _pending[msg_id] = fut
+    try:
+        await ws.send(json.dumps(msg))
+        resp = await asyncio.wait_for(fut, timeout=timeout)
+    finally:
+        _pending.pop(msg_id, None)
     if "error" in resp:
         raise Exception(f"{method} error: {resp['error'].get('message', resp['error'])}")
     return resp.get("result", {})
@@ -40,6 +65,7 @@ async def main():
     global PASS, FAIL
     print("Connecting to browser WebSocket...")
     ws = await websockets.connect(WS_URL, max_size=10 * 1024 * 1024)
+    reader = asyncio.create_task(recv_loop(ws))
     print(f"Connected.\n")
 
     # --- 1. Ping ---
@@ -67,9 +93,17 @@ async def main():
     check("has title", len(r.get("title", "")) > 0, f"got '{r.get('title')}'")
     check("not loading", r.get("loading") is False)
 
+    # --- 5-8 fetch: screenshot/DOM/text/HTML are independent — pipeline them ---
+    shot, dom, page_text, page_html = await asyncio.gather(
+        send_command(ws, "screenshot", {"tab_id": tab_id}),
+        send_command(ws, "get_dom", {"tab_id": tab_id}),
+        send_command(ws, "get_page_text", {"tab_id": tab_id}),
+        send_command(ws, "get_page_html", {"tab_id": tab_id}),
+    )
+
     # --- 5. Screenshot ---
     print("\n5. Screenshot")
-    r = await send_command(ws, "screenshot", {"tab_id": tab_id})
+    r = shot
     image = r.get("image", "")
     check("image is data URL", image.startswith("data:image/png;base64,"), f"starts with: {image[:40]}")
     check("has width", isinstance(r.get("width"), int) and r["width"] > 0, f"width={r.get('width')}")
@@ -84,7 +118,7 @@ async def main():
 
     # --- 6. Get DOM ---
     print("\n6. Get DOM")
-    r = await send_command(ws, "get_dom", {"tab_id": tab_id})
+    r = dom
     check("has elements list", isinstance(r.get("elements"), list))
     check("has url", "example.com" in r.get("url", ""), f"got {r.get('url')}")
     check("has title", len(r.get("title", "")) > 0, f"got '{r.get('title')}'")
@@ -104,7 +138,7 @@ async def main():
 
     # --- 7. Get page text ---
     print("\n7. Get page text")
-    r = await send_command(ws, "get_page_text", {"tab_id": tab_id})
+    r = page_text
     text = r.get("text", "")
     check("has text content", len(text) > 0, f"got {len(text)} chars")
     check("contains 'Example Domain'", "Example Domain" in text, f"text starts with: {text[:80]}")
@@ -115,7 +149,7 @@ async def main():
 
     # --- 8. Get page HTML ---
     print("\n8. Get page HTML")
-    r = await send_command(ws, "get_page_html", {"tab_id": tab_id})
+    r = page_html
     html = r.get("html", "")
     check("has HTML content", len(html) > 0, f"got {len(html)} chars")
     check("starts with <html", html.strip().lower().startswith("<html") or html.strip().lower().startswith("<!doctype"), f"starts with: {html[:40]}")
@@ -149,6 +183,7 @@ async def main():
         print("ALL TESTS PASSED")
     else:
         print("SOME TESTS FAILED")
+    reader.cancel()
     await ws.close()
     return FAIL == 0
 
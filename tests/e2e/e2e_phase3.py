@@ -5,66 +5,42 @@ Uses httpbin.org/forms/post as a real-world form to fill and submit.
 """
 
 import asyncio
-import json
 import sys
-from uuid import uuid4
 
-import websockets
+from _common import Results, WSClient, assert_server
 
-WS_URL = "ws://localhost:9876"
-PASS = 0
-FAIL = 0
 
-
-async def send_command(ws, method, params=None, timeout=30):
-    msg_id = str(uuid4())
-    msg = {"id": msg_id, "method": method, "params": params or {}}
-    await ws.send(json.dumps(msg))
-    raw = await asyncio.wait_for(ws.recv(), timeout=timeout)
-    resp = json.loads(raw)
-    if "error" in resp:
-        raise Exception(f"{method} error: {resp['error'].get('message', resp['error'])}")
-    return resp.get("result", {})
-
-
-def check(name, condition, detail=""):
-    global PASS, FAIL
-    if condition:
-        PASS += 1
-        print(f"  ✓ {name}")
-    else:
-        FAIL += 1
-        print(f"  ✗ {name} — {detail}")
-
-
-async def main():
-    global PASS, FAIL
-    print("Connecting to browser WebSocket...")
-    ws = await websockets.connect(WS_URL, max_size=10 * 1024 * 1024)
-    print(f"Connected.\n")
+async def run(client, ping=True):
+    """Run this phase's checks over an already-connected client.
+    ping=False skips the server check when the runner already did it."""
+    results = Results()
+    check = results.check
 
     # --- 1. Ping ---
-    print("1. Ping")
-    r = await send_command(ws, "ping")
-    check("pong received", r.get("pong") is True)
-    check("version is 0.3.0", r.get("version") == "0.3.0", f"got {r.get('version')}")
+    if ping:
+        print("1. Ping")
+        await assert_server(client, results, "0.3.0")
 
     # --- 2. Create tab and navigate to httpbin form ---
     print("\n2. Create tab → httpbin form")
-    r = await send_command(ws, "create_tab", {"url": "https://httpbin.org/forms/post"})
+    r = await client.call("create_tab", {"url": "https://httpbin.org/forms/post"})
     tab_id = r.get("tab_id")
     check("tab created", tab_id is not None)
-    await send_command(ws, "wait", {"seconds": 4})
+    await asyncio.sleep(1)  # let navigation start
 
-    # --- 3. Get page info ---
-    print("\n3. Get page info")
-    r = await send_command(ws, "get_page_info", {"tab_id": tab_id})
+    # --- 3. Wait for load (returns url/loading — no get_page_info needed) ---
+    print("\n3. Wait for load")
+    r = await client.call("wait_for_load", {"tab_id": tab_id, "timeout": 15})
     check("url has httpbin", "httpbin.org" in r.get("url", ""), f"got {r.get('url')}")
     check("not loading", r.get("loading") is False)
 
     # --- 4. Get DOM (index interactive elements) ---
     print("\n4. Get DOM")
-    r = await send_command(ws, "get_dom", {"tab_id": tab_id})
+    # The form fits in the viewport and only ~a dozen elements matter;
+    # server-side filtering keeps the payload small.
+    r = await client.call(
+        "get_dom", {"tab_id": tab_id, "viewport_only": True, "max_elements": 100}
+    )
     elements = r.get("elements", [])
     check("found interactive elements", len(elements) > 0, f"got {len(elements)}")
     for e in elements[:10]:
@@ -73,55 +49,59 @@ async def main():
         attrs = e.get("attributes", {})
         print(f"    [{e['index']}] <{tag}> {attrs} \"{text}\"")
 
-    # Find form fields by tag/type
-    inputs = {
-        e.get("attributes", {}).get("name", ""): e["index"]
-        for e in elements
-        if e["tag"] in ("input", "textarea", "select")
-    }
+    # Index the elements in one pass: name→index for form fields, plus
+    # the specific buckets later steps need (instead of four O(N) scans).
+    inputs = {}
+    radio_large = []
+    topping_indices = []
+    submit_indices = []
+    for e in elements:
+        attrs = e.get("attributes") or {}
+        tag = e["tag"]
+        if tag in ("input", "textarea", "select") and attrs.get("name"):
+            inputs[attrs["name"]] = e["index"]
+        if tag == "input":
+            etype = attrs.get("type")
+            if etype == "radio" and attrs.get("value") == "large":
+                radio_large.append(e["index"])
+            elif etype == "checkbox":
+                topping_indices.append(e["index"])
+            elif etype == "submit":
+                submit_indices.append(e["index"])
+        elif tag == "button":
+            submit_indices.append(e["index"])
     print(f"    Form fields: {inputs}")
 
-    # --- 5. Fill text fields ---
+    # --- 5. Fill text fields (independent — pipeline all three) ---
     print("\n5. Fill fields")
-    if "custname" in inputs:
-        r = await send_command(ws, "fill_field", {"tab_id": tab_id, "index": inputs["custname"], "value": "ZenLeap Test"})
-        check("filled custname", r.get("success") is True)
-    else:
-        check("custname found", False, "no custname input found")
-
-    if "custtel" in inputs:
-        r = await send_command(ws, "fill_field", {"tab_id": tab_id, "index": inputs["custtel"], "value": "555-1234"})
-        check("filled custtel", r.get("success") is True)
-    else:
-        check("custtel found", False, "no custtel input found")
-
-    if "custemail" in inputs:
-        r = await send_command(ws, "fill_field", {"tab_id": tab_id, "index": inputs["custemail"], "value": "test@zenleap.ai"})
-        check("filled custemail", r.get("success") is True)
-    else:
-        check("custemail found", False, "no custemail input found")
+    fills = [
+        ("custname", "ZenLeap Test"),
+        ("custtel", "555-1234"),
+        ("custemail", "test@zenleap.ai"),
+    ]
+    present = [(name, value) for name, value in fills if name in inputs]
+    for name, _ in fills:
+        if name not in inputs:
+            check(f"{name} found", False, f"no {name} input found")
+    fill_results = await client.send_batch(
+        ("fill_field", {"tab_id": tab_id, "index": inputs[name], "value": value})
+        for name, value in present
+    )
+    for (name, _), r in zip(present, fill_results):
+        check(f"filled {name}", r.get("success") is True)
 
     # --- 6. Click radio button (pizza size) ---
     print("\n6. Click radio button")
-    radio_large = [
-        e["index"] for e in elements
-        if e["tag"] == "input" and e.get("attributes", {}).get("type") == "radio"
-        and e.get("attributes", {}).get("value") == "large"
-    ]
     if radio_large:
-        r = await send_command(ws, "click_element", {"tab_id": tab_id, "index": radio_large[0]})
+        r = await client.call("click_element", {"tab_id": tab_id, "index": radio_large[0]})
         check("clicked size=large radio", r.get("success") is True)
     else:
         check("radio found", False, "no large radio found")
 
     # --- 7. Click a checkbox ---
     print("\n7. Click topping checkbox")
-    topping_indices = [
-        e["index"] for e in elements
-        if e["tag"] == "input" and e.get("attributes", {}).get("type") == "checkbox"
-    ]
     if topping_indices:
-        r = await send_command(ws, "click_element", {"tab_id": tab_id, "index": topping_indices[0]})
+        r = await client.call("click_element", {"tab_id": tab_id, "index": topping_indices[0]})
         check("clicked checkbox", r.get("success") is True)
     else:
         check("checkbox found", False, "no checkboxes found")
@@ -129,26 +109,22 @@ async def main():
     # --- 7b. select_option error on non-select ---
     print("\n7b. select_option error on non-select")
     try:
-        await send_command(ws, "select_option", {"tab_id": tab_id, "index": 0, "value": "x"})
+        await client.call("select_option", {"tab_id": tab_id, "index": 0, "value": "x"})
         check("select_option rejects non-select", False, "should have thrown")
     except Exception as e:
         check("select_option rejects non-select", "not a <select>" in str(e).lower(), str(e))
 
     # --- 8. Scroll ---
     print("\n8. Scroll")
-    r = await send_command(ws, "scroll", {"tab_id": tab_id, "direction": "down", "amount": 200})
+    r = await client.call("scroll", {"tab_id": tab_id, "direction": "down", "amount": 200})
     check("scrolled down", r.get("success") is True)
-    r = await send_command(ws, "scroll", {"tab_id": tab_id, "direction": "up", "amount": 200})
+    r = await client.call("scroll", {"tab_id": tab_id, "direction": "up", "amount": 200})
     check("scrolled back up", r.get("success") is True)
 
     # --- 9. Hover ---
     print("\n9. Hover")
-    submit_indices = [
-        e["index"] for e in elements
-        if e["tag"] == "button" or (e["tag"] == "input" and e.get("attributes", {}).get("type") == "submit")
-    ]
     if submit_indices:
-        r = await send_command(ws, "hover", {"tab_id": tab_id, "index": submit_indices[0]})
+        r = await client.call("hover", {"tab_id": tab_id, "index": submit_indices[0]})
         check("hovered submit", r.get("success") is True)
     else:
         check("submit button found", False, "no submit button found")
@@ -157,40 +133,40 @@ async def main():
     print("\n10. Press key")
     # Focus a field first so key events have a target
     if "custname" in inputs:
-        await send_command(ws, "click_element", {"tab_id": tab_id, "index": inputs["custname"]})
-    r = await send_command(ws, "press_key", {"tab_id": tab_id, "key": "Escape"})
+        await client.call("click_element", {"tab_id": tab_id, "index": inputs["custname"]})
+    r = await client.call("press_key", {"tab_id": tab_id, "key": "Escape"})
     check("pressed Escape", r.get("success") is True)
-    r = await send_command(ws, "press_key", {"tab_id": tab_id, "key": "a", "modifiers": {"ctrl": True}})
+    r = await client.call("press_key", {"tab_id": tab_id, "key": "a", "modifiers": {"ctrl": True}})
     check("pressed Ctrl+a", r.get("success") is True)
 
     # --- 11. Type text ---
     print("\n11. Type text")
     # Focus a field first via click
     if "custname" in inputs:
-        await send_command(ws, "click_element", {"tab_id": tab_id, "index": inputs["custname"]})
-        r = await send_command(ws, "type_text", {"tab_id": tab_id, "text": " extra"})
+        await client.call("click_element", {"tab_id": tab_id, "index": inputs["custname"]})
+        r = await client.call("type_text", {"tab_id": tab_id, "text": " extra"})
         check("typed text", r.get("success") is True)
         check("typed 6 chars", r.get("length") == 6, f"got {r.get('length')}")
 
     # --- 12. Click coordinates ---
     print("\n12. Click coordinates")
-    r = await send_command(ws, "click_coordinates", {"tab_id": tab_id, "x": 100, "y": 100})
+    r = await client.call("click_coordinates", {"tab_id": tab_id, "x": 100, "y": 100})
     check("click_coordinates succeeded", r.get("success") is True)
     check("has tag", len(r.get("tag", "")) > 0)
 
     # --- 13. Screenshot to verify form state ---
     print("\n13. Screenshot verification")
-    r = await send_command(ws, "screenshot", {"tab_id": tab_id})
+    r = await client.call("screenshot", {"tab_id": tab_id})
     check("screenshot taken", r.get("image", "").startswith("data:image/png"))
     print(f"    ({r.get('width')}x{r.get('height')})")
 
     # --- 14. Submit the form (click submit button) ---
     print("\n14. Submit form")
     if submit_indices:
-        r = await send_command(ws, "click_element", {"tab_id": tab_id, "index": submit_indices[0]})
+        r = await client.call("click_element", {"tab_id": tab_id, "index": submit_indices[0]})
         check("clicked submit", r.get("success") is True)
-        await send_command(ws, "wait", {"seconds": 3})
-        r = await send_command(ws, "get_page_info", {"tab_id": tab_id})
+        await asyncio.sleep(1)  # let navigation start
+        r = await client.call("wait_for_load", {"tab_id": tab_id, "timeout": 10})
         check("page changed after submit", "httpbin.org" in r.get("url", ""))
     else:
         check("submit available", False, "no submit button")
@@ -198,34 +174,44 @@ async def main():
     # --- 15. Error handling: stale element ---
     print("\n15. Error: stale element index")
     try:
-        await send_command(ws, "click_element", {"tab_id": tab_id, "index": 9999})
+        await client.call("click_element", {"tab_id": tab_id, "index": 9999})
         check("stale element errors", False, "should have thrown")
     except Exception as e:
-        check("stale element errors gracefully", "not found" in str(e).lower() or "run get_dom" in str(e).lower(), str(e))
+        msg = str(e).lower()
+        check("stale element errors gracefully", "not found" in msg or "run get_dom" in msg, str(e))
 
     # --- 16. Error handling: invalid scroll direction ---
     print("\n16. Error: invalid scroll direction")
     try:
-        await send_command(ws, "scroll", {"tab_id": tab_id, "direction": "diagonal"})
+        await client.call("scroll", {"tab_id": tab_id, "direction": "diagonal"})
         check("bad direction errors", False, "should have thrown")
     except Exception as e:
-        check("bad direction errors gracefully", "invalid direction" in str(e).lower() or "up/down" in str(e).lower(), str(e))
+        msg = str(e).lower()
+        check("bad direction errors gracefully", "invalid direction" in msg or "up/down" in msg, str(e))
 
     # --- 17. Close tab ---
     print("\n17. Close tab")
-    r = await send_command(ws, "close_tab", {"tab_id": tab_id})
+    r = await client.call("close_tab", {"tab_id": tab_id})
     check("tab closed", r.get("success") is True)
 
     # --- Summary ---
     print(f"\n{'='*50}")
-    total = PASS + FAIL
-    print(f"Results: {PASS}/{total} passed, {FAIL} failed")
-    if FAIL == 0:
+    print(f"Results: {results.passed}/{results.total} passed, {results.failed} failed")
+    if results.failed == 0:
         print("ALL TESTS PASSED")
     else:
         print("SOME TESTS FAILED")
-    await ws.close()
-    return FAIL == 0
+    return results.failed == 0
+
+
+async def main():
+    print("Connecting to browser WebSocket...")
+    client = await WSClient.connect()
+    print("Connected.\n")
+    try:
+        return await run(client)
+    finally:
+        await client.close()
 
 
 if __name__ == "__main__":
@@ -3,168 +3,189 @@ Tests multi-tab coordination, action recording/replay, self-healing selectors, a
 """
 
 import asyncio
-import json
-import os
-from uuid import uuid4
-
-import websockets
-
-WS_URL = "ws://localhost:9876"
-PASS = 0
-FAIL = 0
-
-
-async def cmd(ws, method, params=None):
-    msg_id = str(uuid4())
-    await ws.send(json.dumps({"id": msg_id, "method": method, "params": params or {}}))
-    raw = await asyncio.wait_for(ws.recv(), timeout=30)
-    resp = json.loads(raw)
-    if "error" in resp:
-        raise Exception(f"{method} failed: {resp['error']}")
-    return resp.get("result", {})
-
+import functools
+import sys
+from pathlib import Path
+
+import _common
+from _common import Results, WSClient
+
+# Recording file shared by record_save and the cleanup path.
+REC_PATH = "/tmp/zenleap_e2e_recording.json"
+
+
+async def run(client, ping=True):
+    """Run this phase's checks over an already-connected client. The ping
+    kwarg exists for interface parity with the other phases; phase 9 has
+    no server-check step of its own."""
+    # Buffered mode: check output is flushed once per phase section,
+    # collapsing dozens of stdout write syscalls into four.
+    results = Results(buffered=True)
+    check = results.check
+    # One 300s deadline for the whole phase instead of a per-command
+    # asyncio.wait_for: no Timeout object allocation and callback
+    # registration for each of the ~25 small commands.
+    cmd = functools.partial(client.call, timeout=None)
+    batch = functools.partial(client.send_batch, timeout=None)
+
+    async with asyncio.timeout(300):
+        try:
+            # ── 9.1: Multi-Tab Coordination ───────────────────
+            print("\n=== 9.1: Multi-Tab Coordination ===")
+
+            # batch_navigate: open 2 tabs at once
+            nav = await cmd("batch_navigate", {"urls": ["https://example.com", "https://www.iana.org"]})
+            check("Batch navigate succeeds", nav.get("success"))
+            tabs = nav.get("tabs", [])
+            check("Batch created 2 tabs", len(tabs) == 2, f"got {len(tabs)}")
+
+            tab1_id = tabs[0]["tab_id"] if tabs else None
+            tab2_id = tabs[1]["tab_id"] if len(tabs) > 1 else None
+
+            # Both tabs load independently — wait for them in one array frame.
+            # wait_for_load polls until the page settles, so no grace sleep.
+            await batch([
+                ("wait_for_load", {"tab_id": tid, "timeout": 10})
+                for tid in (tab1_id, tab2_id) if tid
+            ])
+
+            # compare_tabs
+            if tab1_id and tab2_id:
+                comparison = await cmd("compare_tabs", {"tab_ids": [tab1_id, tab2_id]})
+                check("Compare returns 2 entries", len(comparison) == 2)
+                if comparison:
+                    check("Compare has URL", "url" in comparison[0])
+                    check("Compare has title", "title" in comparison[0])
+                    check("Compare has text_preview", "text_preview" in comparison[0])
+                    check("Text previews differ", comparison[0].get("text_preview") != comparison[1].get("text_preview"))
+
+            results.flush()
+
+            # ── 9.2: Action Recording ─────────────────────────
+            print("\n=== 9.2: Action Recording ===")
+
+            # Start recording
+            start = await cmd("record_start")
+            check("Record start succeeds", start.get("success"))
+
+            # Perform some actions that should be recorded. Reuse tab1 from
+            # phase 9.1 (already open on example.com) instead of paying for a
+            # create_tab + load cycle; the round trip ends back on example.com
+            # so the later phases need no repositioning. Each navigate is
+            # gathered with a wait_for_load fenced on the tab's nav counter
+            # (navigate defers its loadURI, so an unfenced wait can return
+            # before the load even starts).
+            nav = await cmd("get_navigation_status", {"tab_id": tab1_id})
+            nav_count = nav.get("nav_count", 0)
+            _, wait1 = await asyncio.gather(
+                cmd("navigate", {"tab_id": tab1_id, "url": "https://www.iana.org"}),
+                cmd("wait_for_load", {"tab_id": tab1_id, "timeout": 10,
+                                      "require_navigation_after": nav_count}),
+            )
+            await asyncio.gather(
+                cmd("navigate", {"tab_id": tab1_id, "url": "https://example.com"}),
+                cmd("wait_for_load", {"tab_id": tab1_id, "timeout": 10,
+                                      "require_navigation_after": wait1.get("nav_count", 0)}),
+            )
+
+            # Stop recording
+            stop = await cmd("record_stop")
+            check("Record stop succeeds", stop.get("success"))
+            action_count = stop.get("actions", 0)
+            check("Actions were recorded", action_count > 0, f"{action_count} actions")
+
+            # Save recording
+            save = await cmd("record_save", {"file_path": REC_PATH})
+            check("Record save succeeds", save.get("success"))
+            check("Save reports action count", save.get("actions", 0) > 0)
+
+            # Verify file was created (we can't read it from the browser, but check save worked)
+            check("Save file path", save.get("file") == REC_PATH)
+
+            # Replay the recording
+            replay = await cmd("record_replay", {"file_path": REC_PATH, "delay": 0.2})
+            check("Replay succeeds", replay.get("success"))
+            check("Replay count matches", replay.get("replayed", 0) > 0,
+                  f"replayed {replay.get('replayed')}/{replay.get('total')}")
+
+            results.flush()
+
+            # ── 9.3: Self-Healing Selectors ───────────────────
+            print("\n=== 9.3: Self-Healing Selectors ===")
+
+            # tab1 is already back on example.com after the replay round trip,
+            # so no repositioning navigate is needed here.
+            # Get DOM to populate element map + metadata
+            dom = await cmd("get_dom", {"tab_id": tab1_id})
+            elements = dom.get("elements", [])
+            check("DOM has elements for self-heal test", len(elements) > 0)
+
+            # The self-healing is transparent — if we click an element after a
+            # minor page update that doesn't change the element, it should still work.
+            # We test by clicking an element (which should succeed).
+            if elements:
+                idx = elements[0]["index"]
+                try:
+                    click_result = await cmd("click_element", {"tab_id": tab1_id, "index": idx})
+                    check("Click element works (self-healing active)", click_result.get("success"))
+                except Exception as e:
+                    check("Click element works", False, str(e))
+
+            results.flush()
+
+            # ── 9.4: Visual Grounding (via MCP, not browser) ─
+            print("\n=== 9.4: Visual Grounding ===")
+            # Visual grounding is tested at the MCP layer (Python-side fuzzy matching).
+            # Here we verify the DOM data is compatible. The snapshot fetched for
+            # the self-heal test covers that — reuse it rather than transferring
+            # and parsing the largest payload of the run a second time.
+            elements2 = elements
+            if elements2:
+                # Single fused pass instead of two any() scans over what can
+                # be thousands of element dicts; bail as soon as both hit.
+                has_text = has_attrs = False
+                for el in elements2:
+                    if not has_text and el.get("text"):
+                        has_text = True
+                    if not has_attrs and el.get("attributes"):
+                        has_attrs = True
+                    if has_text and has_attrs:
+                        break
+                check("Elements have text for grounding", has_text)
+                check("Elements have attributes for grounding", has_attrs)
+            else:
+                check("DOM has elements for grounding test", False)
+
+            # Cleanup — close both tabs with a single batched frame.
+            await batch([
+                ("close_tab", {"tab_id": tid})
+                for tid in (tab1_id, tab2_id) if tid
+            ])
+
+        finally:
+            results.flush()
+            # Clean up recording file; missing_ok avoids raising and
+            # catching when there is nothing to remove
+            Path(REC_PATH).unlink(missing_ok=True)
 
-def check(name, condition, detail=""):
-    global PASS, FAIL
-    status = "PASS" if condition else "FAIL"
-    if not condition:
-        FAIL += 1
+    print(f"\n{'='*50}")
+    print(f"Phase 9 E2E Results: {results.passed} passed, {results.failed} failed, {results.total} total")
+    if results.failed > 0:
+        print("SOME TESTS FAILED")
     else:
-        PASS += 1
-    print(f"  [{status}] {name}" + (f" — {detail}" if detail else ""))
-    return condition
+        print("ALL TESTS PASSED")
+    return results.failed == 0
 
 
 async def main():
-    global PASS, FAIL
-
-    ws = await websockets.connect(WS_URL, max_size=10 * 1024 * 1024)
-
+    client = await WSClient.connect()
     try:
-        # ── 9.1: Multi-Tab Coordination ───────────────────
-        print("\n=== 9.1: Multi-Tab Coordination ===")
-
-        # batch_navigate: open 2 tabs at once
-        batch = await cmd(ws, "batch_navigate", {"urls": ["https://example.com", "https://www.iana.org"]})
-        check("Batch navigate succeeds", batch.get("success"))
-        tabs = batch.get("tabs", [])
-        check("Batch created 2 tabs", len(tabs) == 2, f"got {len(tabs)}")
-
-        tab1_id = tabs[0]["tab_id"] if tabs else None
-        tab2_id = tabs[1]["tab_id"] if len(tabs) > 1 else None
-
-        await asyncio.sleep(3)
-        if tab1_id:
-            await cmd(ws, "wait_for_load", {"tab_id": tab1_id, "timeout": 10})
-        if tab2_id:
-            await cmd(ws, "wait_for_load", {"tab_id": tab2_id, "timeout": 10})
-
-        # compare_tabs
-        if tab1_id and tab2_id:
-            comparison = await cmd(ws, "compare_tabs", {"tab_ids": [tab1_id, tab2_id]})
-            check("Compare returns 2 entries", len(comparison) == 2)
-            if comparison:
-                check("Compare has URL", "url" in comparison[0])
-                check("Compare has title", "title" in comparison[0])
-                check("Compare has text_preview", "text_preview" in comparison[0])
-                check("Text previews differ", comparison[0].get("text_preview") != comparison[1].get("text_preview"))
-
-        # ── 9.2: Action Recording ─────────────────────────
-        print("\n=== 9.2: Action Recording ===")
-
-        # Start recording
-        start = await cmd(ws, "record_start")
-        check("Record start succeeds", start.get("success"))
-
-        # Perform some actions that should be recorded
-        nav_tab = await cmd(ws, "create_tab", {"url": "https://example.com"})
-        nav_tab_id = nav_tab["tab_id"]
-        await asyncio.sleep(2)
-        await cmd(ws, "wait_for_load", {"tab_id": nav_tab_id, "timeout": 10})
-        await cmd(ws, "navigate", {"tab_id": nav_tab_id, "url": "https://www.iana.org"})
-        await asyncio.sleep(2)
-
-        # Stop recording
-        stop = await cmd(ws, "record_stop")
-        check("Record stop succeeds", stop.get("success"))
-        action_count = stop.get("actions", 0)
-        check("Actions were recorded", action_count > 0, f"{action_count} actions")
-
-        # Save recording
-        rec_path = "/tmp/zenleap_e2e_recording.json"
-        save = await cmd(ws, "record_save", {"file_path": rec_path})
-        check("Record save succeeds", save.get("success"))
-        check("Save reports action count", save.get("actions", 0) > 0)
-
-        # Verify file was created (we can't read it from the browser, but check save worked)
-        check("Save file path", save.get("file") == rec_path)
-
-        # Replay the recording
-        replay = await cmd(ws, "record_replay", {"file_path": rec_path, "delay": 0.2})
-        check("Replay succeeds", replay.get("success"))
-        check("Replay count matches", replay.get("replayed", 0) > 0,
-              f"replayed {replay.get('replayed')}/{replay.get('total')}")
-
-        # ── 9.3: Self-Healing Selectors ───────────────────
-        print("\n=== 9.3: Self-Healing Selectors ===")
-
-        # Navigate to example.com
-        await cmd(ws, "navigate", {"tab_id": nav_tab_id, "url": "https://example.com"})
-        await asyncio.sleep(2)
-        await cmd(ws, "wait_for_load", {"tab_id": nav_tab_id, "timeout": 10})
-
-        # Get DOM to populate element map + metadata
-        dom = await cmd(ws, "get_dom", {"tab_id": nav_tab_id})
-        elements = dom.get("elements", [])
-        check("DOM has elements for self-heal test", len(elements) > 0)
-
-        # The self-healing is transparent — if we click an element after a
-        # minor page update that doesn't change the element, it should still work.
-        # We test by clicking an element (which should succeed).
-        if elements:
-            idx = elements[0]["index"]
-            try:
-                click_result = await cmd(ws, "click_element", {"tab_id": nav_tab_id, "index": idx})
-                check("Click element works (self-healing active)", click_result.get("success"))
-            except Exception as e:
-                check("Click element works", False, str(e))
-
-        # ── 9.4: Visual Grounding (via MCP, not browser) ─
-        print("\n=== 9.4: Visual Grounding ===")
-        # Visual grounding is tested at the MCP layer (Python-side fuzzy matching).
-        # Here we verify the DOM data is compatible.
-        dom2 = await cmd(ws, "get_dom", {"tab_id": nav_tab_id})
-        elements2 = dom2.get("elements", [])
-        if elements2:
-            has_text = any(el.get("text") for el in elements2)
-            check("Elements have text for grounding", has_text)
-            has_attrs = any(el.get("attributes") for el in elements2)
-            check("Elements have attributes for grounding", has_attrs)
-        else:
-            check("DOM has elements for grounding test", False)
-
-        # Cleanup
-        if tab1_id:
-            await cmd(ws, "close_tab", {"tab_id": tab1_id})
-        if tab2_id:
-            await cmd(ws, "close_tab", {"tab_id": tab2_id})
-        await cmd(ws, "close_tab", {"tab_id": nav_tab_id})
-
+        return await run(client)
     finally:
-        await ws.close()
-        # Clean up recording file
-        try:
-            os.remove("/tmp/zenleap_e2e_recording.json")
-        except OSError:
-            pass
-
-    print(f"\n{'='*50}")
-    print(f"Phase 9 E2E Results: {PASS} passed, {FAIL} failed, {PASS + FAIL} total")
-    if FAIL > 0:
-        print("SOME TESTS FAILED")
-    else:
-        print("ALL TESTS PASSED")
+        await client.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # _common.run rather than a bare import: run() is this phase's entry
+    # point, so the loop helper stays behind its module name.
+    sys.exit(0 if _common.run(main()) else 1)
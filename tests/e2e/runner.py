@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Run the phase 3/4/5/8/9 e2e suites over a single WebSocket connection.
+
+Opening one connection for the whole session saves a handshake per phase
+file. The phases are run sequentially: phase5 asserts workspace/tab
+isolation and phase3 drives its own httpbin form, so running them
+concurrently over shared browser state would make the checks flaky.
+"""
+
+import sys
+
+import e2e_phase3
+import e2e_phase4
+import e2e_phase5
+import e2e_phase8
+import e2e_phase9
+from _common import Results, WSClient, assert_server, run
+
+PHASES = [
+    ("Phase 3 (interaction)", e2e_phase3),
+    ("Phase 4 (console)", e2e_phase4),
+    ("Phase 5 (workspace)", e2e_phase5),
+    ("Phase 8 (token efficiency)", e2e_phase8),
+    ("Phase 9 (advanced intelligence)", e2e_phase9),
+]
+
+
+async def main():
+    print("Connecting to browser WebSocket...")
+    client = await WSClient.connect()
+    print("Connected.\n")
+    ok = True
+    try:
+        # One server check for the whole session instead of one per phase
+        session = Results()
+        await assert_server(client, session, "1.0.0")
+        ok = session.failed == 0
+        for name, phase in PHASES:
+            print(f"\n{'#' * 50}\n# {name}\n{'#' * 50}")
+            ok = await phase.run(client, ping=False) and ok
+    finally:
+        await client.close()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run(main()) else 1)
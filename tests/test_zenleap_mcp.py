@@ -6,49 +6,107 @@ and error handling. Uses a mock WebSocket server to simulate the browser.
 
 import asyncio
 import base64
+import contextlib
 import json
 import os
-from unittest.mock import AsyncMock, MagicMock, patch
+import re
+from collections import deque
+from unittest.mock import patch
 from uuid import uuid4
 
 import pytest
-import pytest_asyncio
 
 from mcp.server.fastmcp.utilities.types import Image
 
 import zenleap_mcp_server as server
 
+try:
+    # Optional, fastest of the three: msgspec amortizes encoder/decoder
+    # state across calls instead of rebuilding it per dumps/loads, which
+    # adds up over the thousands of tiny fake frames in this suite.
+    import msgspec.json
+
+    _dumps = msgspec.json.Encoder().encode
+    _loads = msgspec.json.Decoder().decode
+except ImportError:
+    try:
+        # Optional, mirrors the server: (de)serializing the fake frames and
+        # re-parsing sent envelopes dominates wall-time across ~200 tests.
+        import orjson
+
+        _dumps = orjson.dumps
+        _loads = orjson.loads
+    except ImportError:
+        _dumps = json.dumps
+        _loads = json.loads
+
 
 # ── Helpers ─────────────────────────────────────────────────────
 
+def _R(result):
+    """Wrap a tool result in the single-response envelope list nearly
+    every test feeds use_ws — one spelling of the {"id": "x", ...} frame
+    instead of ~110 inline copies."""
+    return [{"id": "x", "result": result}]
+
+
+# Raised when a test awaits more frames than its responses list holds —
+# a test-authoring bug, so keep responses matched 1:1 with awaits. A
+# single preallocated instance skips the per-raise construction.
+_TIMEOUT_EXC = asyncio.TimeoutError("No more responses")
+
 
 class FakeResponse:
     """Simulates a websockets v16 response object."""
 
+    __slots__ = ("headers",)
+
     def __init__(self, headers=None):
         self.headers = headers or {}
 
 
+# Shared for the (common) headerless case so reset() skips two
+# allocations; nothing ever mutates a FakeResponse after construction.
+_NO_HEADERS = FakeResponse()
+
+
 class FakeWebSocket:
     """Simulates a websockets connection for testing."""
 
+    # Slots over an instance dict: the fakes are pure fixed-shape state
+    # holders, and the handful constructed outside _shared_ws stay cheap.
+    __slots__ = ("sent", "last_msg", "_responses", "closed", "response")
+
     def __init__(self, responses=None, response_headers=None):
         self.sent = []
-        self._responses = responses or []
-        self._response_idx = 0
+        self.reset(responses, response_headers)
+
+    def reset(self, responses=None, response_headers=None):
+        """Rearm for the next test (shared-instance reuse via use_ws)."""
+        self.sent.clear()
+        self.last_msg = None
+        # Encode once up front and pop on recv: no per-recv dumps, and
+        # pre-serialized responses (strings/bytes) pass through as-is.
+        self._responses = deque(
+            _dumps(r) if isinstance(r, (dict, list)) else r
+            for r in responses or ()
+        )
         self.closed = False
         # v16+ API: ws.response.headers
-        self.response = FakeResponse(response_headers or {})
+        self.response = (
+            FakeResponse(response_headers) if response_headers else _NO_HEADERS
+        )
 
     async def send(self, data):
         self.sent.append(data)
+        # Parsed once here so assertions read last_msg instead of
+        # re-decoding the envelope in every test body.
+        self.last_msg = _loads(data)
 
     async def recv(self):
-        if self._response_idx < len(self._responses):
-            resp = self._responses[self._response_idx]
-            self._response_idx += 1
-            return json.dumps(resp) if isinstance(resp, dict) else resp
-        raise asyncio.TimeoutError("No more responses")
+        if self._responses:
+            return self._responses.popleft()
+        raise _TIMEOUT_EXC
 
     async def ping(self):
         if self.closed:
@@ -58,17 +116,75 @@ class FakeWebSocket:
         self.closed = True
 
 
+# One FakeWebSocket for the whole module: use_ws() rearms it per test
+# instead of allocating a fresh instance and a patch.object MagicMock
+# for each of the ~200 tests.
+_shared_ws = FakeWebSocket()
+
+
+def _connect_stub(ws, calls=None):
+    """Stand-in for websockets.connect: a plain async closure skips
+    AsyncMock's spec introspection and MagicMock construction. Pass a
+    list as ``calls`` to record (args, kwargs) for URL/kwarg asserts."""
+
+    async def _connect(*args, **kwargs):
+        if calls is not None:
+            calls.append((args, kwargs))
+        return ws
+
+    return _connect
+
+
+# Keyword arguments get_ws() is expected to pass to websockets.connect,
+# shared by the session-routing URL assertions.
+_CONNECT_KWARGS = {
+    "max_size": 10 * 1024 * 1024,
+    "ping_interval": 30,
+    "ping_timeout": 120,
+}
+
+
+@contextlib.contextmanager
+def use_ws(responses=None, response_headers=None):
+    """Point server.get_ws at the shared FakeWebSocket, preloaded with the
+    given responses. A plain attribute swap — no mock plumbing."""
+    _shared_ws.reset(responses, response_headers)
+
+    async def _get_ws():
+        return _shared_ws
+
+    orig = server.get_ws
+    server.get_ws = _get_ws
+    try:
+        yield _shared_ws
+    finally:
+        server.get_ws = orig
+
+
+async def _check_envelope(fn, args, kwargs, method, expected, result):
+    """Call a tool against a canned result and assert both the envelope
+    it sent (method plus a params subset) and the result pass-through.
+    Shared body for the table-driven tool-test classes."""
+    with use_ws(_R(result)) as fake_ws:
+        out = await fn(*args, **kwargs)
+    msg = fake_ws.last_msg
+    assert msg["method"] == method
+    for key, value in expected.items():
+        assert msg["params"][key] == value
+    assert _loads(out) == result
+
+
 # ── text_result ─────────────────────────────────────────────────
 
 
 class TestTextResult:
     def test_dict(self):
         result = server.text_result({"key": "value"})
-        assert json.loads(result) == {"key": "value"}
+        assert _loads(result) == {"key": "value"}
 
     def test_list(self):
         result = server.text_result([1, 2, 3])
-        assert json.loads(result) == [1, 2, 3]
+        assert _loads(result) == [1, 2, 3]
 
     def test_string(self):
         assert server.text_result("hello") == "hello"
@@ -79,82 +195,74 @@ class TestTextResult:
     def test_nested(self):
         data = {"tabs": [{"id": "1", "title": "Test"}]}
         result = server.text_result(data)
-        assert json.loads(result) == data
+        assert _loads(result) == data
 
 
 # ── browser_command ─────────────────────────────────────────────
 
 
 class TestBrowserCommand:
-    @pytest.mark.asyncio
     async def test_sends_correct_format(self):
-        fake_ws = FakeWebSocket(
+        with use_ws(
             responses=[{"id": "ignored", "result": {"ok": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        ) as fake_ws:
             result = await server.browser_command("ping", {"foo": "bar"})
 
         assert len(fake_ws.sent) == 1
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "ping"
         assert msg["params"] == {"foo": "bar"}
         assert "id" in msg
         assert result == {"ok": True}
 
-    @pytest.mark.asyncio
     async def test_default_empty_params(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": {}}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({})) as fake_ws:
             await server.browser_command("list_tabs")
 
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"] == {}
 
-    @pytest.mark.asyncio
     async def test_raises_on_error_response(self):
-        fake_ws = FakeWebSocket(
+        with use_ws(
             responses=[{"id": "x", "error": {"message": "Tab not found"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            with pytest.raises(Exception, match="Tab not found"):
+        ) as fake_ws:
+            with pytest.raises(Exception, match=_ERR_TAB_NOT_FOUND):
                 await server.browser_command("close_tab", {"tab_id": "bad"})
 
-    @pytest.mark.asyncio
     async def test_raises_on_timeout(self):
-        fake_ws = FakeWebSocket(responses=[])  # no responses -> timeout
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[]) as fake_ws:  # no responses -> timeout
             with pytest.raises(asyncio.TimeoutError):
                 await server.browser_command("ping")
 
-    @pytest.mark.asyncio
     async def test_retries_on_connection_error(self):
         """Connection-level errors trigger one retry with reconnection."""
-        call_count = 0
-
-        async def flaky_get_ws():
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                ws = FakeWebSocket(responses=[])
-                # Make send raise to simulate connection error
-                async def bad_send(msg):
-                    raise ConnectionError("socket closed")
-                ws.send = bad_send
-                return ws
-            else:
-                return FakeWebSocket(
-                    responses=[{"id": "x", "result": {"ok": True}}]
-                )
-
-        with patch.object(server, "get_ws", side_effect=flaky_get_ws):
+        class BrokenSend(FakeWebSocket):
+            __slots__ = ()
+
+            async def send(self, msg):
+                # Simulate the connection dying on the first attempt.
+                raise ConnectionError("socket closed")
+
+        bad_ws = BrokenSend()
+        good_ws = FakeWebSocket(_R({"ok": True}))
+        # One preallocated connection per attempt, handed out in order; a
+        # third get_ws call would exhaust the iterator and fail loudly.
+        attempts = iter([bad_ws, good_ws])
+        real_get_ws = server.get_ws
+
+        async def fake_get_ws():
+            return next(attempts)
+
+        server.get_ws = fake_get_ws
+        try:
             result = await server.browser_command("ping")
+        finally:
+            server.get_ws = real_get_ws
         assert result == {"ok": True}
-        assert call_count == 2  # first attempt failed, second succeeded
+        assert len(good_ws.sent) == 1  # retry went over the second connection
 
-    @pytest.mark.asyncio
     async def test_returns_empty_dict_when_no_result_key(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x"}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[{"id": "x"}]) as fake_ws:
             result = await server.browser_command("ping")
         assert result == {}
 
@@ -163,38 +271,38 @@ class TestBrowserCommand:
 
 
 class TestGetWs:
-    @pytest.mark.asyncio
     async def test_creates_new_connection(self):
-        server._ws_connection = None
-        server._session_id = None
         fake_ws = FakeWebSocket()
-        with patch("websockets.connect", new_callable=AsyncMock, return_value=fake_ws):
+        with patch("websockets.connect", new=_connect_stub(fake_ws)):
             ws = await server.get_ws()
         assert ws is fake_ws
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_reuses_existing_connection(self):
         fake_ws = FakeWebSocket()
         server._ws_connection = fake_ws
         ws = await server.get_ws()
         assert ws is fake_ws
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_reconnects_on_dead_connection(self):
         dead_ws = FakeWebSocket()
         dead_ws.closed = True
         server._ws_connection = dead_ws
 
         new_ws = FakeWebSocket()
-        with patch("websockets.connect", new_callable=AsyncMock, return_value=new_ws):
+        with patch("websockets.connect", new=_connect_stub(new_ws)):
             ws = await server.get_ws()
         assert ws is new_ws
-        server._ws_connection = None
-        server._session_id = None
+
+    async def test_connects_once_across_calls(self):
+        """Repeated get_ws() calls reuse the live connection — exactly
+        one websockets.connect for the whole sequence."""
+        fake_ws = FakeWebSocket()
+        calls = []
+        with patch("websockets.connect", new=_connect_stub(fake_ws, calls)):
+            first = await server.get_ws()
+            second = await server.get_ws()
+        assert first is second is fake_ws
+        assert len(calls) == 1
 
 
 # ── Tool Definitions ────────────────────────────────────────────
@@ -203,106 +311,40 @@ class TestGetWs:
 class TestToolDefinitions:
     """Verify all expected tools are registered and callable."""
 
-    @pytest.mark.asyncio
     async def test_create_tab(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"tab_id": "panel1", "url": "https://example.com"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"tab_id": "panel1", "url": "https://example.com"})) as fake_ws:
             result = await server.browser_create_tab("https://example.com")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["tab_id"] == "panel1"
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "create_tab"
         assert msg["params"]["url"] == "https://example.com"
 
-    @pytest.mark.asyncio
     async def test_create_tab_persist(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"tab_id": "panel1", "url": "https://example.com", "persist": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"tab_id": "panel1", "url": "https://example.com", "persist": True})) as fake_ws:
             result = await server.browser_create_tab("https://example.com", persist=True)
-        data = json.loads(result)
+        data = _loads(result)
         assert data["persist"] is True
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["persist"] is True
 
-    @pytest.mark.asyncio
     async def test_create_tab_no_persist_by_default(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"tab_id": "panel1", "url": "https://example.com", "persist": False}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"tab_id": "panel1", "url": "https://example.com", "persist": False})) as fake_ws:
             result = await server.browser_create_tab("https://example.com")
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["persist"] is False
 
-    @pytest.mark.asyncio
-    async def test_close_tab_default(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_close_tab()
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] is None
-
-    @pytest.mark.asyncio
     async def test_list_tabs(self):
         tabs = [
             {"tab_id": "p1", "title": "Tab 1", "url": "https://a.com", "active": True},
             {"tab_id": "p2", "title": "Tab 2", "url": "https://b.com", "active": False},
         ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": tabs}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(tabs)) as fake_ws:
             result = await server.browser_list_tabs()
-        data = json.loads(result)
+        data = _loads(result)
         assert len(data) == 2
         assert data[0]["active"] is True
 
-    @pytest.mark.asyncio
-    async def test_navigate(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_navigate("https://example.com")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "navigate"
-        assert msg["params"]["url"] == "https://example.com"
-
-    @pytest.mark.asyncio
-    async def test_go_back(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_go_back()
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "go_back"
-
-    @pytest.mark.asyncio
-    async def test_go_forward(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_go_forward()
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "go_forward"
-
-    @pytest.mark.asyncio
-    async def test_reload(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_reload()
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "reload"
-
-    @pytest.mark.asyncio
     async def test_get_page_info(self):
         info = {
             "url": "https://example.com",
@@ -311,22 +353,11 @@ class TestToolDefinitions:
             "can_go_back": True,
             "can_go_forward": False,
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": info}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(info)) as fake_ws:
             result = await server.browser_get_page_info()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["title"] == "Example"
 
-    @pytest.mark.asyncio
-    async def test_wait(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_wait(0.1)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["seconds"] == 0.1
-
 
 # ── Observation Tools (Phase 2) ────────────────────────────────
 
@@ -341,48 +372,38 @@ _TINY_PNG = (
 _TINY_PNG_B64 = base64.b64encode(_TINY_PNG).decode()
 _TINY_DATA_URL = f"data:image/png;base64,{_TINY_PNG_B64}"
 
+# 1x1 white JPEG header, b64-encoded once for the reflect tests.
+_TINY_JPEG_DATA_URL = "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8\xff\xe0").decode()
+_LONG_TEXT = "x" * 100000
+# Serialized once at import: recv() hands pre-encoded responses straight
+# through, so the screenshot tests skip a per-call encode of the largest
+# canned payload in the module.
+_SCREENSHOT_RESP = _dumps(
+    {"id": "x", "result": {"image": _TINY_DATA_URL, "width": 1, "height": 1}}
+)
+# Likewise for the loaded-page envelope the wait_for_load tests share.
+_LOADED_RESP = _dumps(
+    {"id": "x", "result": {"success": True, "url": "https://example.com",
+                           "title": "Example", "loading": False}}
+)
+
 
 class TestScreenshot:
-    @pytest.mark.asyncio
     async def test_returns_image(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"image": _TINY_DATA_URL, "width": 1, "height": 1}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[_SCREENSHOT_RESP]) as fake_ws:
             result = await server.browser_screenshot()
         assert isinstance(result, Image)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "screenshot"
 
-    @pytest.mark.asyncio
-    async def test_sends_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"image": _TINY_DATA_URL, "width": 1, "height": 1}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_screenshot("panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
-    @pytest.mark.asyncio
     async def test_default_tab_id_none(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"image": _TINY_DATA_URL, "width": 1, "height": 1}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[_SCREENSHOT_RESP]) as fake_ws:
             await server.browser_screenshot()
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["tab_id"] is None
 
 
 class TestGetDom:
-    @pytest.mark.asyncio
     async def test_formats_elements(self):
         dom_result = {
             "elements": [
@@ -404,375 +425,165 @@ class TestGetDom:
             "url": "https://example.com",
             "title": "Example",
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom_result}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dom_result)) as fake_ws:
             result = await server.browser_get_dom()
         assert "Page: https://example.com" in result
         assert "Title: Example" in result
         assert '[0] <a href="https://example.com">Click me</a>' in result
         assert '[1] <button type="submit">Submit</button>' in result
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "get_dom"
 
-    @pytest.mark.asyncio
     async def test_empty_elements(self):
         dom_result = {
             "elements": [],
             "url": "about:blank",
             "title": "",
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom_result}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dom_result)) as fake_ws:
             result = await server.browser_get_dom()
         assert "Page: about:blank" in result
         assert "Interactive elements:" in result
 
-    @pytest.mark.asyncio
-    async def test_sends_tab_id(self):
-        dom_result = {"elements": [], "url": "", "title": ""}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom_result}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_get_dom("panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
 
 class TestGetPageText:
-    @pytest.mark.asyncio
     async def test_returns_text(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"text": "Hello World"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"text": "Hello World"})) as fake_ws:
             result = await server.browser_get_page_text()
         assert result == "Hello World"
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "get_page_text"
 
-    @pytest.mark.asyncio
     async def test_empty_text(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"text": ""}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"text": ""})) as fake_ws:
             result = await server.browser_get_page_text()
         assert result == ""
 
-    @pytest.mark.asyncio
-    async def test_sends_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"text": "test"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_get_page_text("panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
 
 class TestGetPageHTML:
-    @pytest.mark.asyncio
     async def test_returns_html(self):
         html = "<html><body><h1>Hello</h1></body></html>"
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"html": html}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"html": html})) as fake_ws:
             result = await server.browser_get_page_html()
         assert result == html
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "get_page_html"
 
-    @pytest.mark.asyncio
     async def test_empty_html(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"html": ""}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"html": ""})) as fake_ws:
             result = await server.browser_get_page_html()
         assert result == ""
 
-    @pytest.mark.asyncio
-    async def test_sends_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"html": "<html></html>"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_get_page_html("panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
 
 # ── Interaction Tools (Phase 3) ─────────────────────────────────
 
 
-class TestClick:
-    @pytest.mark.asyncio
-    async def test_click_element(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "tag": "button", "text": "Submit"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_click(0)
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "click_element"
-        assert msg["params"]["index"] == 0
-
-    @pytest.mark.asyncio
-    async def test_click_with_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "tag": "a", "text": "Link"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_click(3, "panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-        assert msg["params"]["index"] == 3
-
-    @pytest.mark.asyncio
-    async def test_click_coordinates(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "tag": "div", "text": ""}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_click_coordinates(100, 200)
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "click_coordinates"
-        assert msg["params"]["x"] == 100
-        assert msg["params"]["y"] == 200
-
-
-class TestFill:
-    @pytest.mark.asyncio
-    async def test_fill_field(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "tag": "input", "value": "hello"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_fill(2, "hello")
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "fill_field"
-        assert msg["params"]["index"] == 2
-        assert msg["params"]["value"] == "hello"
-
-    @pytest.mark.asyncio
-    async def test_fill_with_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "tag": "textarea", "value": "text"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_fill(1, "text", "panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
-    @pytest.mark.asyncio
-    async def test_select_option(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "value": "opt2"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_select_option(5, "opt2")
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "select_option"
-        assert msg["params"]["index"] == 5
-        assert msg["params"]["value"] == "opt2"
-
-
-class TestType:
-    @pytest.mark.asyncio
-    async def test_type_text(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "length": 5}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_type("hello")
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "type_text"
-        assert msg["params"]["text"] == "hello"
-
-    @pytest.mark.asyncio
-    async def test_press_key(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "key": "Enter"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_press_key("Enter")
-        data = json.loads(result)
-        assert data["key"] == "Enter"
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "press_key"
-        assert msg["params"]["key"] == "Enter"
-
-    @pytest.mark.asyncio
-    async def test_press_key_with_modifiers(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "key": "a"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_press_key("a", ctrl=True, shift=True)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["modifiers"]["ctrl"] is True
-        assert msg["params"]["modifiers"]["shift"] is True
-        assert msg["params"]["modifiers"]["alt"] is False
-        assert msg["params"]["modifiers"]["meta"] is False
-
-
-class TestScroll:
-    @pytest.mark.asyncio
-    async def test_scroll_default(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "scrollX": 0, "scrollY": 500}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_scroll()
-        data = json.loads(result)
-        assert data["scrollY"] == 500
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "scroll"
-        assert msg["params"]["direction"] == "down"
-        assert msg["params"]["amount"] == 500
-
-    @pytest.mark.asyncio
-    async def test_scroll_up(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "scrollX": 0, "scrollY": 0}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_scroll("up", 300)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["direction"] == "up"
-        assert msg["params"]["amount"] == 300
-
-
-class TestHover:
-    @pytest.mark.asyncio
-    async def test_hover(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "tag": "a", "text": "Link"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_hover(1)
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "hover"
-        assert msg["params"]["index"] == 1
-
-    @pytest.mark.asyncio
-    async def test_hover_with_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "tag": "button", "text": "Menu"}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_hover(0, "panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-        assert msg["params"]["index"] == 0
+class TestToolEnvelopes:
+    """Table-driven coverage for the structurally identical interaction
+    and navigation tools: call it, check the envelope it sent, and check
+    the browser result is passed through. One parametrized test instead
+    of ~20 near-clone methods keeps collection and loop setup cheap."""
+
+    # (tool fn, call args, call kwargs, expected method,
+    #  expected params subset, canned browser result)
+    CASES = [
+        pytest.param(server.browser_navigate, ("https://example.com",), {},
+                     "navigate", {"url": "https://example.com"},
+                     {"success": True}, id="navigate"),
+        pytest.param(server.browser_go_back, (), {}, "go_back", {},
+                     {"success": True}, id="go_back"),
+        pytest.param(server.browser_go_forward, (), {}, "go_forward", {},
+                     {"success": True}, id="go_forward"),
+        pytest.param(server.browser_reload, (), {}, "reload", {},
+                     {"success": True}, id="reload"),
+        pytest.param(server.browser_wait, (0.1,), {}, "wait",
+                     {"seconds": 0.1}, {"success": True}, id="wait"),
+        pytest.param(server.browser_close_tab, (), {}, "close_tab",
+                     {"tab_id": None}, {"success": True}, id="close_tab_default"),
+        pytest.param(server.browser_click, (0,), {}, "click_element",
+                     {"index": 0},
+                     {"success": True, "tag": "button", "text": "Submit"},
+                     id="click_element"),
+        pytest.param(server.browser_click, (3, "panel1"), {}, "click_element",
+                     {"index": 3, "tab_id": "panel1"},
+                     {"success": True, "tag": "a", "text": "Link"},
+                     id="click_with_tab_id"),
+        pytest.param(server.browser_click_coordinates, (100, 200), {},
+                     "click_coordinates", {"x": 100, "y": 200},
+                     {"success": True, "tag": "div", "text": ""},
+                     id="click_coordinates"),
+        pytest.param(server.browser_fill, (2, "hello"), {}, "fill_field",
+                     {"index": 2, "value": "hello"},
+                     {"success": True, "tag": "input", "value": "hello"},
+                     id="fill_field"),
+        pytest.param(server.browser_fill, (1, "text", "panel1"), {},
+                     "fill_field", {"tab_id": "panel1"},
+                     {"success": True, "tag": "textarea", "value": "text"},
+                     id="fill_with_tab_id"),
+        pytest.param(server.browser_select_option, (5, "opt2"), {},
+                     "select_option", {"index": 5, "value": "opt2"},
+                     {"success": True, "value": "opt2"}, id="select_option"),
+        pytest.param(server.browser_type, ("hello",), {}, "type_text",
+                     {"text": "hello"}, {"success": True, "length": 5},
+                     id="type_text"),
+        pytest.param(server.browser_press_key, ("Enter",), {}, "press_key",
+                     {"key": "Enter"}, {"success": True, "key": "Enter"},
+                     id="press_key"),
+        pytest.param(server.browser_press_key, ("a",),
+                     {"ctrl": True, "shift": True}, "press_key",
+                     {"modifiers": {"ctrl": True, "shift": True,
+                                    "alt": False, "meta": False}},
+                     {"success": True, "key": "a"}, id="press_key_modifiers"),
+        pytest.param(server.browser_scroll, (), {}, "scroll",
+                     {"direction": "down", "amount": 500},
+                     {"success": True, "scrollX": 0, "scrollY": 500},
+                     id="scroll_default"),
+        pytest.param(server.browser_scroll, ("up", 300), {}, "scroll",
+                     {"direction": "up", "amount": 300},
+                     {"success": True, "scrollX": 0, "scrollY": 0},
+                     id="scroll_up"),
+        pytest.param(server.browser_hover, (1,), {}, "hover", {"index": 1},
+                     {"success": True, "tag": "a", "text": "Link"},
+                     id="hover"),
+        pytest.param(server.browser_hover, (0, "panel1"), {}, "hover",
+                     {"index": 0, "tab_id": "panel1"},
+                     {"success": True, "tag": "button", "text": "Menu"},
+                     id="hover_with_tab_id"),
+        pytest.param(server.browser_console_setup, (), {}, "console_setup",
+                     {}, {"success": True}, id="console_setup"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
 
 # ── Console / Eval (Phase 4) ────────────────────────────────────
 
 
-class TestConsoleSetup:
-    @pytest.mark.asyncio
-    async def test_setup(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_console_setup()
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "console_setup"
-
-    @pytest.mark.asyncio
-    async def test_setup_with_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"success": True}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_console_setup("panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
-
 class TestConsoleLogs:
-    @pytest.mark.asyncio
     async def test_formats_logs(self):
         logs = [
             {"level": "log", "message": "hello world", "timestamp": "2025-01-01T00:00:00.000Z"},
             {"level": "warn", "message": "be careful", "timestamp": "2025-01-01T00:00:01.000Z"},
         ]
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"logs": logs}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"logs": logs})) as fake_ws:
             result = await server.browser_console_logs()
         assert "[log]" in result
         assert "hello world" in result
         assert "[warn]" in result
         assert "be careful" in result
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "console_get_logs"
 
-    @pytest.mark.asyncio
     async def test_empty_logs(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"logs": []}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"logs": []})) as fake_ws:
             result = await server.browser_console_logs()
         assert "no console logs" in result.lower()
 
-    @pytest.mark.asyncio
-    async def test_sends_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"logs": []}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_console_logs("panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
 
 class TestConsoleErrors:
-    @pytest.mark.asyncio
     async def test_formats_errors(self):
         errors = [
             {
@@ -784,190 +595,155 @@ class TestConsoleErrors:
                 "timestamp": "2025-01-01T00:00:00.000Z",
             },
         ]
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"errors": errors}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"errors": errors})) as fake_ws:
             result = await server.browser_console_errors()
         assert "[uncaught_error]" in result
         assert "x is not defined" in result
         assert "script.js:42" in result
 
-    @pytest.mark.asyncio
     async def test_empty_errors(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"errors": []}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"errors": []})) as fake_ws:
             result = await server.browser_console_errors()
         assert "no errors" in result.lower()
 
-    @pytest.mark.asyncio
-    async def test_sends_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"errors": []}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_console_errors("panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
 
 class TestWaitForLoad:
-    @pytest.mark.asyncio
     async def test_wait_for_load(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "url": "https://example.com", "title": "Example", "loading": False}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[_LOADED_RESP]) as fake_ws:
             result = await server.browser_wait_for_load()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["success"] is True
         assert data["loading"] is False
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "wait_for_load"
 
-    @pytest.mark.asyncio
     async def test_wait_for_load_with_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"success": True, "url": "https://example.com", "title": "Example", "loading": False}}
-            ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[_LOADED_RESP]) as fake_ws:
             await server.browser_wait_for_load("panel1", timeout=10)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["tab_id"] == "panel1"
         assert msg["params"]["timeout"] == 10
 
-    @pytest.mark.asyncio
     async def test_wait_for_load_still_loading(self):
-        fake_ws = FakeWebSocket(
+        with use_ws(
             responses=[
                 {"id": "x", "result": {"success": True, "url": "https://example.com", "title": "", "loading": True}}
             ]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        ) as fake_ws:
             result = await server.browser_wait_for_load(timeout=1)
-        data = json.loads(result)
+        data = _loads(result)
         assert data["loading"] is True
 
 
 class TestSaveScreenshot:
-    @pytest.mark.asyncio
-    async def test_save_screenshot(self, tmp_path):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"image": _TINY_DATA_URL, "width": 1, "height": 1}}
-            ]
-        )
-        file_path = str(tmp_path / "test.png")
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_save_screenshot(file_path)
+    @pytest.fixture(scope="class")
+    @staticmethod
+    def shot_dir(tmp_path_factory):
+        # One directory for the class (the file names don't collide)
+        # instead of a fresh tmp_path mkdir/rmtree per test.
+        return tmp_path_factory.mktemp("shots")
+
+    async def test_save_screenshot(self, shot_dir):
+        path = shot_dir / "test.png"
+        with use_ws(responses=[_SCREENSHOT_RESP]) as fake_ws:
+            result = await server.browser_save_screenshot(os.fspath(path))
         assert "Screenshot saved" in result
         assert "test.png" in result
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "screenshot"
-        # Verify the file was written with correct PNG data
-        with open(file_path, "rb") as f:
-            data = f.read()
-        assert data == _TINY_PNG
-
-    @pytest.mark.asyncio
-    async def test_save_screenshot_with_tab_id(self, tmp_path):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"image": _TINY_DATA_URL, "width": 1, "height": 1}}
-            ]
-        )
-        file_path = str(tmp_path / "tab.png")
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_save_screenshot(file_path, "panel1")
-        msg = json.loads(fake_ws.sent[0])
+        # Verify the file was written with correct PNG data. Size first:
+        # one stat, and a mismatch fails before reading the file back.
+        assert path.stat().st_size == len(_TINY_PNG)
+        assert path.read_bytes() == _TINY_PNG
+
+    async def test_save_screenshot_with_tab_id(self, shot_dir):
+        path = shot_dir / "tab.png"
+        with use_ws(responses=[_SCREENSHOT_RESP]) as fake_ws:
+            await server.browser_save_screenshot(os.fspath(path), "panel1")
+        msg = fake_ws.last_msg
         assert msg["params"]["tab_id"] == "panel1"
 
-    @pytest.mark.asyncio
-    async def test_save_screenshot_creates_dirs(self, tmp_path):
-        fake_ws = FakeWebSocket(
-            responses=[
-                {"id": "x", "result": {"image": _TINY_DATA_URL, "width": 1, "height": 1}}
-            ]
-        )
-        file_path = str(tmp_path / "subdir" / "nested" / "shot.png")
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_save_screenshot(file_path)
+    async def test_save_screenshot_creates_dirs(self, shot_dir):
+        path = shot_dir / "subdir" / "nested" / "shot.png"
+        with use_ws(responses=[_SCREENSHOT_RESP]) as fake_ws:
+            result = await server.browser_save_screenshot(os.fspath(path))
         assert "Screenshot saved" in result
-        assert os.path.exists(file_path)
+        assert path.exists()
 
 
 class TestConsoleEval:
-    @pytest.mark.asyncio
     async def test_eval_success(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"result": "2"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"result": "2"})) as fake_ws:
             result = await server.browser_console_eval("1+1")
         assert result == "2"
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "console_evaluate"
         assert msg["params"]["expression"] == "1+1"
 
-    @pytest.mark.asyncio
     async def test_eval_error(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"error": "x is not defined", "stack": "ReferenceError..."}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"error": "x is not defined", "stack": "ReferenceError..."})) as fake_ws:
             result = await server.browser_console_eval("x.y.z")
         assert "Error:" in result
         assert "x is not defined" in result
 
-    @pytest.mark.asyncio
     async def test_eval_with_tab_id(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"result": "hello"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"result": "hello"})) as fake_ws:
             await server.browser_console_eval("'hello'", "panel1")
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["tab_id"] == "panel1"
         assert msg["params"]["expression"] == "'hello'"
 
-    @pytest.mark.asyncio
     async def test_eval_returns_string(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "result": {"result": "Example Domain"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"result": "Example Domain"})) as fake_ws:
             result = await server.browser_console_eval("document.title")
         assert result == "Example Domain"
 
 
+# ── tab_id forwarding ───────────────────────────────────────────
+
+
+_TAB_ID_CASES = [
+    pytest.param(server.browser_screenshot,
+                 {"image": _TINY_DATA_URL, "width": 1, "height": 1},
+                 id="screenshot"),
+    pytest.param(server.browser_get_dom,
+                 {"elements": [], "url": "", "title": ""}, id="get_dom"),
+    pytest.param(server.browser_get_page_text, {"text": "test"}, id="get_page_text"),
+    pytest.param(server.browser_get_page_html, {"html": "<html></html>"}, id="get_page_html"),
+    pytest.param(server.browser_console_setup, {"success": True}, id="console_setup"),
+    pytest.param(server.browser_console_logs, {"logs": []}, id="console_logs"),
+    pytest.param(server.browser_console_errors, {"errors": []}, id="console_errors"),
+]
+
+
+class TestTabIdForwarding:
+    """One parametrized test replaces the near-identical test_sends_tab_id
+    in each tool class above: same assertion, fewer test objects for the
+    collector and the event loop to set up."""
+
+    @pytest.mark.parametrize("tool_fn,result", _TAB_ID_CASES)
+    async def test_sends_tab_id(self, tool_fn, result):
+        with use_ws(_R(result)) as fake_ws:
+            await tool_fn("panel1")
+        assert fake_ws.last_msg["params"]["tab_id"] == "panel1"
+
+
 # ── Error Paths ─────────────────────────────────────────────────
 
 
 class TestErrorPaths:
-    @pytest.mark.asyncio
     async def test_connection_refused(self):
-        server._ws_connection = None
-        with patch(
-            "websockets.connect",
-            new_callable=AsyncMock,
-            side_effect=ConnectionRefusedError("refused"),
-        ):
+        async def refuse(*args, **kwargs):
+            raise ConnectionRefusedError("refused")
+
+        with patch("websockets.connect", new=refuse):
             with pytest.raises(ConnectionRefusedError):
                 await server.get_ws()
-        server._ws_connection = None
 
-    @pytest.mark.asyncio
     async def test_error_response_unknown_message(self):
-        fake_ws = FakeWebSocket(
+        with use_ws(
             responses=[{"id": "x", "error": {"code": -1}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        ) as fake_ws:
             with pytest.raises(Exception, match="Unknown browser error"):
                 await server.browser_command("bad_method")
 
@@ -976,156 +752,126 @@ class TestErrorPaths:
 
 
 class TestListFrames:
-    @pytest.mark.asyncio
     async def test_list_frames(self):
         frames = [
             {"frame_id": 1, "url": "https://example.com", "is_top": True},
             {"frame_id": 2, "url": "https://ads.example.com", "is_top": False},
         ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": frames}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(frames)) as fake_ws:
             result = await server.browser_list_frames()
-        data = json.loads(result)
+        data = _loads(result)
         assert len(data) == 2
         assert data[0]["is_top"] is True
 
 
 class TestGetDomWithFrameId:
-    @pytest.mark.asyncio
     async def test_get_dom_passes_frame_id(self):
         dom = {"elements": [], "url": "https://example.com", "title": "Test"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dom)) as fake_ws:
             await server.browser_get_dom(frame_id=42)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["frame_id"] == 42
 
-    @pytest.mark.asyncio
     async def test_get_dom_no_frame_id(self):
         dom = {"elements": [], "url": "https://example.com", "title": "Test"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dom)) as fake_ws:
             await server.browser_get_dom()
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert "frame_id" not in msg["params"]
 
 
 class TestWaitForElement:
-    @pytest.mark.asyncio
     async def test_wait_for_element(self):
         resp = {"found": True, "tag": "button", "text": "Submit"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_wait_for_element("button.submit")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["found"] is True
 
 
 class TestWaitForText:
-    @pytest.mark.asyncio
     async def test_wait_for_text(self):
         resp = {"found": True}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_wait_for_text("Hello World")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["found"] is True
 
 
 class TestNavigationStatus:
-    @pytest.mark.asyncio
     async def test_get_navigation_status(self):
         resp = {"url": "https://example.com", "http_status": 200, "error_code": 0, "loading": False}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_get_navigation_status()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["http_status"] == 200
 
-    @pytest.mark.asyncio
     async def test_get_navigation_status_404(self):
         resp = {"url": "https://example.com/bad", "http_status": 404, "error_code": 0, "loading": False}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_get_navigation_status()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["http_status"] == 404
 
 
 class TestDialogs:
-    @pytest.mark.asyncio
     async def test_get_dialogs_empty(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": []}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R([])) as fake_ws:
             result = await server.browser_get_dialogs()
-        assert json.loads(result) == []
+        assert _loads(result) == []
 
-    @pytest.mark.asyncio
     async def test_get_dialogs_with_alert(self):
         dialogs = [{"type": "alertCheck", "message": "Hello!", "default_value": ""}]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dialogs}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dialogs)) as fake_ws:
             result = await server.browser_get_dialogs()
-        data = json.loads(result)
+        data = _loads(result)
         assert len(data) == 1
         assert data[0]["type"] == "alertCheck"
 
-    @pytest.mark.asyncio
     async def test_handle_dialog_accept(self):
         resp = {"success": True, "action": "accept", "type": "alertCheck"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_handle_dialog("accept")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["success"] is True
 
-    @pytest.mark.asyncio
     async def test_handle_dialog_with_text(self):
         resp = {"success": True, "action": "accept", "type": "prompt"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_handle_dialog("accept", text="my input")
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["text"] == "my input"
 
 
 class TestTabEvents:
-    @pytest.mark.asyncio
     async def test_get_tab_events_empty(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": []}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R([])) as fake_ws:
             result = await server.browser_get_tab_events()
-        assert json.loads(result) == []
+        assert _loads(result) == []
 
-    @pytest.mark.asyncio
     async def test_get_tab_events_with_popup(self):
         events = [
             {"type": "tab_opened", "tab_id": "p1", "opener_tab_id": "t1", "is_agent_tab": True},
         ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": events}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(events)) as fake_ws:
             result = await server.browser_get_tab_events()
-        data = json.loads(result)
+        data = _loads(result)
         assert data[0]["type"] == "tab_opened"
         assert data[0]["is_agent_tab"] is True
 
 
 class TestClipboard:
-    @pytest.mark.asyncio
     async def test_clipboard_read(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": {"text": "hello"}}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"text": "hello"})) as fake_ws:
             result = await server.browser_clipboard_read()
         assert result == "hello"
 
-    @pytest.mark.asyncio
     async def test_clipboard_write(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": {"success": True, "length": 5}}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R({"success": True, "length": 5})) as fake_ws:
             result = await server.browser_clipboard_write("hello")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["text"] == "hello"
 
 
@@ -1133,308 +879,238 @@ class TestClipboard:
 
 
 class TestCookies:
-    @pytest.mark.asyncio
-    async def test_get_cookies(self):
-        cookies = [
-            {"name": "session", "value": "abc123", "domain": "example.com", "path": "/",
-             "secure": True, "httpOnly": True, "sameSite": "lax", "expires": "session"},
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": cookies}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_get_cookies(url="https://example.com")
-        data = json.loads(result)
-        assert len(data) == 1
-        assert data[0]["name"] == "session"
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "get_cookies"
-        assert msg["params"]["url"] == "https://example.com"
-
-    @pytest.mark.asyncio
-    async def test_get_cookies_with_name(self):
-        cookies = [{"name": "token", "value": "xyz"}]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": cookies}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_get_cookies(url="https://example.com", name="token")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["name"] == "token"
-
-    @pytest.mark.asyncio
-    async def test_set_cookie(self):
-        resp = {"success": True, "cookie": "test=val"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_set_cookie("test", "val")
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "set_cookie"
-        assert msg["params"]["name"] == "test"
-        assert msg["params"]["value"] == "val"
-
-    @pytest.mark.asyncio
-    async def test_set_cookie_with_options(self):
-        resp = {"success": True, "cookie": "pref=dark"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_set_cookie(
-                "pref", "dark",
-                httpOnly=True, sameSite="Strict"
-            )
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["httpOnly"] is True
-        assert msg["params"]["sameSite"] == "Strict"
-
-    @pytest.mark.asyncio
-    async def test_delete_cookies(self):
-        resp = {"success": True, "removed": 3}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_delete_cookies(url="https://example.com")
-        data = json.loads(result)
-        assert data["removed"] == 3
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "delete_cookies"
-
-    @pytest.mark.asyncio
-    async def test_delete_cookie_by_name(self):
-        resp = {"success": True, "removed": 1}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_delete_cookies(url="https://example.com", name="token")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["name"] == "token"
+    # (tool fn, call args, call kwargs, expected method,
+    #  expected params subset, canned browser result)
+    CASES = [
+        pytest.param(server.browser_get_cookies, (),
+                     {"url": "https://example.com"},
+                     "get_cookies", {"url": "https://example.com"},
+                     [{"name": "session", "value": "abc123",
+                       "domain": "example.com", "path": "/", "secure": True,
+                       "httpOnly": True, "sameSite": "lax",
+                       "expires": "session"}],
+                     id="get_cookies"),
+        pytest.param(server.browser_get_cookies, (),
+                     {"url": "https://example.com", "name": "token"},
+                     "get_cookies", {"name": "token"},
+                     [{"name": "token", "value": "xyz"}],
+                     id="get_cookies_by_name"),
+        pytest.param(server.browser_set_cookie, ("test", "val"), {},
+                     "set_cookie", {"name": "test", "value": "val"},
+                     {"success": True, "cookie": "test=val"},
+                     id="set_cookie"),
+        pytest.param(server.browser_set_cookie, ("pref", "dark"),
+                     {"httpOnly": True, "sameSite": "Strict"},
+                     "set_cookie", {"httpOnly": True, "sameSite": "Strict"},
+                     {"success": True, "cookie": "pref=dark"},
+                     id="set_cookie_options"),
+        pytest.param(server.browser_delete_cookies, (),
+                     {"url": "https://example.com"},
+                     "delete_cookies", {"url": "https://example.com"},
+                     {"success": True, "removed": 3}, id="delete_cookies"),
+        pytest.param(server.browser_delete_cookies, (),
+                     {"url": "https://example.com", "name": "token"},
+                     "delete_cookies", {"name": "token"},
+                     {"success": True, "removed": 1},
+                     id="delete_cookie_by_name"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
 
 # ── Phase 7: Storage ──────────────────────────────────────────
 
 
 class TestStorage:
-    @pytest.mark.asyncio
-    async def test_get_storage_single_key(self):
-        resp = {"value": "dark"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_get_storage("localStorage", "theme")
-        data = json.loads(result)
-        assert data["value"] == "dark"
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "get_storage"
-        assert msg["params"]["storage_type"] == "localStorage"
-        assert msg["params"]["key"] == "theme"
-
-    @pytest.mark.asyncio
-    async def test_get_storage_all(self):
-        resp = {"entries": {"theme": "dark", "lang": "en"}, "count": 2}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_get_storage("sessionStorage")
-        data = json.loads(result)
-        assert data["count"] == 2
-
-    @pytest.mark.asyncio
-    async def test_set_storage(self):
-        resp = {"success": True, "key": "theme", "length": 1}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_set_storage("localStorage", "theme", "dark")
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "set_storage"
-        assert msg["params"]["key"] == "theme"
-        assert msg["params"]["value"] == "dark"
-
-    @pytest.mark.asyncio
-    async def test_delete_storage_key(self):
-        resp = {"success": True, "key": "theme", "length": 0}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_delete_storage("localStorage", "theme")
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "delete_storage"
-        assert msg["params"]["key"] == "theme"
-
-    @pytest.mark.asyncio
-    async def test_delete_storage_clear_all(self):
-        resp = {"success": True, "cleared": 5, "length": 0}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_delete_storage("sessionStorage")
-        data = json.loads(result)
-        assert data["cleared"] == 5
+    CASES = [
+        pytest.param(server.browser_get_storage, ("localStorage", "theme"), {},
+                     "get_storage",
+                     {"storage_type": "localStorage", "key": "theme"},
+                     {"value": "dark"}, id="get_single_key"),
+        pytest.param(server.browser_get_storage, ("sessionStorage",), {},
+                     "get_storage", {"storage_type": "sessionStorage"},
+                     {"entries": {"theme": "dark", "lang": "en"}, "count": 2},
+                     id="get_all"),
+        pytest.param(server.browser_set_storage,
+                     ("localStorage", "theme", "dark"), {},
+                     "set_storage", {"key": "theme", "value": "dark"},
+                     {"success": True, "key": "theme", "length": 1},
+                     id="set"),
+        pytest.param(server.browser_delete_storage,
+                     ("localStorage", "theme"), {},
+                     "delete_storage", {"key": "theme"},
+                     {"success": True, "key": "theme", "length": 0},
+                     id="delete_key"),
+        pytest.param(server.browser_delete_storage, ("sessionStorage",), {},
+                     "delete_storage", {"storage_type": "sessionStorage"},
+                     {"success": True, "cleared": 5, "length": 0},
+                     id="clear_all"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
 
 # ── Phase 7: Network Monitoring ───────────────────────────────
 
 
+# Expected formatted log lines, in order, for the entries fixture below.
+_LOG_RE = re.compile(
+    r"GET https://api\.example\.com/data \[200\]"
+    r".*POST https://api\.example\.com/submit \[201\]",
+    re.S,
+)
+
+
 class TestNetworkMonitoring:
-    @pytest.mark.asyncio
-    async def test_network_monitor_start(self):
-        resp = {"success": True, "note": "Network monitoring started"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_network_monitor_start()
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "network_monitor_start"
-
-    @pytest.mark.asyncio
-    async def test_network_monitor_stop(self):
-        resp = {"success": True, "note": "Network monitoring stopped"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_network_monitor_stop()
-        data = json.loads(result)
-        assert data["success"] is True
+    # start/stop are plain envelope+passthrough; the get_log tests below
+    # stay individual because they assert on the formatted text output.
+    CASES = [
+        pytest.param(server.browser_network_monitor_start, (), {},
+                     "network_monitor_start", {},
+                     {"success": True, "note": "Network monitoring started"},
+                     id="start"),
+        pytest.param(server.browser_network_monitor_stop, (), {},
+                     "network_monitor_stop", {},
+                     {"success": True, "note": "Network monitoring stopped"},
+                     id="stop"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
-    @pytest.mark.asyncio
     async def test_network_get_log_empty(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": []}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R([])) as fake_ws:
             result = await server.browser_network_get_log()
         assert "no network entries" in result.lower()
 
-    @pytest.mark.asyncio
     async def test_network_get_log_with_entries(self):
         entries = [
             {"method": "GET", "url": "https://api.example.com/data", "type": "response", "status": 200, "content_type": "application/json"},
             {"method": "POST", "url": "https://api.example.com/submit", "type": "response", "status": 201, "content_type": ""},
         ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": entries}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(entries)) as fake_ws:
             result = await server.browser_network_get_log()
-        assert "GET https://api.example.com/data [200]" in result
-        assert "POST https://api.example.com/submit [201]" in result
+        # One compiled pattern instead of two substring scans; the .*
+        # between the lines also pins their relative order.
+        assert _LOG_RE.search(result)
 
-    @pytest.mark.asyncio
     async def test_network_get_log_with_filters(self):
         entries = [{"method": "GET", "url": "https://example.com", "status": 404}]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": entries}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(entries)) as fake_ws:
             await server.browser_network_get_log(url_filter="example", method_filter="GET", status_filter=404, limit=10)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["url_filter"] == "example"
         assert msg["params"]["method_filter"] == "GET"
         assert msg["params"]["status_filter"] == 404
         assert msg["params"]["limit"] == 10
 
+    async def test_network_get_log_since_seq(self):
+        entries = [{"method": "GET", "url": "https://example.com/late", "status": 200, "seq": 43}]
+        with use_ws(_R(entries)) as fake_ws:
+            result = await server.browser_network_get_log(since_seq=42)
+        msg = fake_ws.last_msg
+        assert msg["params"]["since_seq"] == 42
+        assert "#43 GET https://example.com/late [200]" in result
+
 
 # ── Phase 7: Request Interception ─────────────────────────────
 
 
 class TestRequestInterception:
-    @pytest.mark.asyncio
-    async def test_add_rule_block(self):
-        resp = {"success": True, "rule_id": 1}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_intercept_add_rule("ads\\.example\\.com", "block")
-        data = json.loads(result)
-        assert data["rule_id"] == 1
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "intercept_add_rule"
-        assert msg["params"]["pattern"] == "ads\\.example\\.com"
-        assert msg["params"]["action"] == "block"
-
-    @pytest.mark.asyncio
-    async def test_add_rule_modify_headers(self):
-        resp = {"success": True, "rule_id": 2}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_intercept_add_rule(
-                "api\\.example\\.com", "modify_headers",
-                headers='{"Authorization": "Bearer tok123"}'
-            )
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["headers"] == {"Authorization": "Bearer tok123"}
-
-    @pytest.mark.asyncio
-    async def test_remove_rule(self):
-        resp = {"success": True}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_intercept_remove_rule(1)
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["rule_id"] == 1
-
-    @pytest.mark.asyncio
-    async def test_list_rules(self):
-        rules = [
-            {"id": 1, "pattern": "ads\\.com", "action": "block", "headers": {}},
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": rules}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_intercept_list_rules()
-        data = json.loads(result)
-        assert len(data) == 1
-        assert data[0]["action"] == "block"
+    CASES = [
+        pytest.param(server.browser_intercept_add_rule,
+                     ("ads\\.example\\.com", "block"), {},
+                     "intercept_add_rule",
+                     {"pattern": "ads\\.example\\.com", "action": "block"},
+                     {"success": True, "rule_id": 1}, id="add_rule_block"),
+        pytest.param(server.browser_intercept_add_rule,
+                     ("api\\.example\\.com", "modify_headers"),
+                     {"headers": '{"Authorization": "Bearer tok123"}'},
+                     "intercept_add_rule",
+                     {"headers": {"Authorization": "Bearer tok123"}},
+                     {"success": True, "rule_id": 2},
+                     id="add_rule_modify_headers"),
+        pytest.param(server.browser_intercept_remove_rule, (1,), {},
+                     "intercept_remove_rule", {"rule_id": 1},
+                     {"success": True}, id="remove_rule"),
+        pytest.param(server.browser_intercept_list_rules, (), {},
+                     "intercept_list_rules", {},
+                     [{"id": 1, "pattern": "ads\\.com", "action": "block",
+                       "headers": {}}],
+                     id="list_rules"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
 
 # ── Phase 7: Session Persistence ──────────────────────────────
 
 
 class TestSessionPersistence:
-    @pytest.mark.asyncio
     async def test_session_save(self):
         resp = {"success": True, "tabs": 3, "cookies": 5, "file": "/tmp/session.json"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_session_save("/tmp/session.json")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["tabs"] == 3
         assert data["cookies"] == 5
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "session_save"
         assert msg["params"]["file_path"] == "/tmp/session.json"
 
-    @pytest.mark.asyncio
     async def test_session_restore(self):
         resp = {"success": True, "tabs_restored": 3, "cookies_restored": 5}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_session_restore("/tmp/session.json")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["tabs_restored"] == 3
         assert data["cookies_restored"] == 5
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "session_restore"
 
 
 # ── Phase 8: Smart DOM Filtering ──────────────────────────────
 
 
+def _dom(*elements, **extra):
+    """DOM payload with the url/title boilerplate the DOM-shaping tests
+    never vary; keyword args override or extend the envelope (total,
+    incremental, diff, ...)."""
+    return {"elements": list(elements), "url": "https://example.com",
+            "title": "Test", **extra}
+
+
 class TestSmartDOMFiltering:
-    @pytest.mark.asyncio
     async def test_viewport_only(self):
-        dom = {"elements": [{"index": 0, "tag": "button", "text": "Submit", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 100, "h": 40}}], "url": "https://example.com", "title": "Test", "total": 1}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        dom = _dom({"index": 0, "tag": "button", "text": "Submit", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 100, "h": 40}}, total=1)
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_get_dom(viewport_only=True)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["viewport_only"] is True
         assert "Submit" in result
 
-    @pytest.mark.asyncio
     async def test_max_elements(self):
-        dom = {"elements": [{"index": 0, "tag": "a", "text": "Link", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 50, "h": 20}}], "url": "https://example.com", "title": "Test", "total": 1}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        dom = _dom({"index": 0, "tag": "a", "text": "Link", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 50, "h": 20}}, total=1)
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_get_dom(max_elements=10)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["max_elements"] == 10
 
-    @pytest.mark.asyncio
     async def test_default_params_not_sent(self):
-        dom = {"elements": [], "url": "", "title": "", "total": 0}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(_dom(url="", title="", total=0))) as fake_ws:
             await server.browser_get_dom()
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert "viewport_only" not in msg["params"]
         assert "max_elements" not in msg["params"]
         assert "incremental" not in msg["params"]
@@ -1444,36 +1120,27 @@ class TestSmartDOMFiltering:
 
 
 class TestIncrementalDOM:
-    @pytest.mark.asyncio
     async def test_incremental_diff(self):
-        dom = {
-            "elements": [{"index": 0, "tag": "button", "text": "New", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 50, "h": 30}}],
-            "url": "https://example.com",
-            "title": "Test",
-            "total": 1,
-            "incremental": True,
-            "diff": {"added": 1, "removed": 0, "total": 1, "added_elements": [{"index": 0, "tag": "button", "text": "New"}], "removed_elements": []},
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        dom = _dom(
+            {"index": 0, "tag": "button", "text": "New", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 50, "h": 30}},
+            total=1,
+            incremental=True,
+            diff={"added": 1, "removed": 0, "total": 1, "added_elements": [{"index": 0, "tag": "button", "text": "New"}], "removed_elements": []},
+        )
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_get_dom(incremental=True)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["incremental"] is True
         assert "Changes: +1 -0" in result
         assert "Added:" in result
 
-    @pytest.mark.asyncio
     async def test_incremental_no_changes(self):
-        dom = {
-            "elements": [],
-            "url": "https://example.com",
-            "title": "Test",
-            "total": 0,
-            "incremental": True,
-            "diff": {"added": 0, "removed": 0, "total": 0, "added_elements": [], "removed_elements": []},
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        dom = _dom(
+            total=0,
+            incremental=True,
+            diff={"added": 0, "removed": 0, "total": 0, "added_elements": [], "removed_elements": []},
+        )
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_get_dom(incremental=True)
         assert "Changes: +0 -0" in result
 
@@ -1482,55 +1149,35 @@ class TestIncrementalDOM:
 
 
 class TestCompactDOM:
-    @pytest.mark.asyncio
     async def test_compact_representation(self):
-        dom = {
-            "elements": [
-                {"index": 0, "tag": "a", "text": "Example", "attributes": {"href": "https://example.com"}, "rect": {"x": 0, "y": 0, "w": 100, "h": 20}},
-                {"index": 1, "tag": "button", "text": "Submit", "attributes": {"type": "submit"}, "rect": {"x": 0, "y": 40, "w": 80, "h": 30}},
-                {"index": 2, "tag": "input", "text": "", "attributes": {"value": "hello", "type": "text"}, "rect": {"x": 0, "y": 80, "w": 200, "h": 30}},
-            ],
-            "url": "https://example.com",
-            "title": "Test",
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        dom = _dom(
+            {"index": 0, "tag": "a", "text": "Example", "attributes": {"href": "https://example.com"}, "rect": {"x": 0, "y": 0, "w": 100, "h": 20}},
+            {"index": 1, "tag": "button", "text": "Submit", "attributes": {"type": "submit"}, "rect": {"x": 0, "y": 40, "w": 80, "h": 30}},
+            {"index": 2, "tag": "input", "text": "", "attributes": {"value": "hello", "type": "text"}, "rect": {"x": 0, "y": 80, "w": 200, "h": 30}},
+        )
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_get_elements_compact()
         assert "URL: https://example.com" in result
         assert "[0] Example (a \u2192https://example.com)" in result
         assert "[1] Submit (button type=submit)" in result
         assert "[2]  (input =hello)" in result
 
-    @pytest.mark.asyncio
     async def test_compact_with_role(self):
-        dom = {
-            "elements": [
-                {"index": 0, "tag": "div", "text": "Menu", "role": "button", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 50, "h": 30}},
-            ],
-            "url": "https://example.com",
-            "title": "Test",
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        dom = _dom({"index": 0, "tag": "div", "text": "Menu", "role": "button", "attributes": {}, "rect": {"x": 0, "y": 0, "w": 50, "h": 30}})
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_get_elements_compact()
         assert "[0] Menu (div role=button)" in result
 
-    @pytest.mark.asyncio
     async def test_compact_viewport_only(self):
-        dom = {"elements": [], "url": "https://example.com", "title": "Test"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(_dom())) as fake_ws:
             await server.browser_get_elements_compact(viewport_only=True)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["viewport_only"] is True
 
-    @pytest.mark.asyncio
     async def test_compact_max_elements(self):
-        dom = {"elements": [], "url": "https://example.com", "title": "Test"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(_dom())) as fake_ws:
             await server.browser_get_elements_compact(max_elements=20)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["max_elements"] == 20
 
 
@@ -1538,7 +1185,6 @@ class TestCompactDOM:
 
 
 class TestAccessibilityTree:
-    @pytest.mark.asyncio
     async def test_accessibility_tree(self):
         resp = {
             "nodes": [
@@ -1549,8 +1195,7 @@ class TestAccessibilityTree:
             ],
             "total": 4,
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_get_accessibility_tree()
         assert "Accessibility tree (4 nodes)" in result
         assert "[document] Example" in result
@@ -1558,40 +1203,32 @@ class TestAccessibilityTree:
         assert "  [link] Click me" in result
         assert "  [pushbutton] Submit" in result
 
-    @pytest.mark.asyncio
     async def test_accessibility_tree_error(self):
         resp = {"nodes": [], "error": "Accessibility service not available"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_get_accessibility_tree()
         assert "Accessibility tree error" in result
 
-    @pytest.mark.asyncio
     async def test_accessibility_tree_empty(self):
         resp = {"nodes": [], "total": 0}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_get_accessibility_tree()
         assert "no accessibility nodes" in result
 
-    @pytest.mark.asyncio
     async def test_accessibility_tree_with_value(self):
         resp = {
             "nodes": [{"role": "entry", "name": "Search", "value": "hello", "depth": 0}],
             "total": 1,
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_get_accessibility_tree()
         assert "[entry] Search =hello" in result
 
-    @pytest.mark.asyncio
     async def test_accessibility_tree_sends_params(self):
         resp = {"nodes": [], "total": 0}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             await server.browser_get_accessibility_tree("panel1", frame_id=42)
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "get_accessibility_tree"
         assert msg["params"]["tab_id"] == "panel1"
         assert msg["params"]["frame_id"] == 42
@@ -1601,58 +1238,50 @@ class TestAccessibilityTree:
 
 
 class TestMultiTabCoordination:
-    @pytest.mark.asyncio
     async def test_compare_tabs(self):
         resp = [
             {"tab_id": "p1", "url": "https://a.com", "title": "A", "text_preview": "Page A"},
             {"tab_id": "p2", "url": "https://b.com", "title": "B", "text_preview": "Page B"},
         ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_compare_tabs("p1,p2")
-        data = json.loads(result)
+        data = _loads(result)
         assert len(data) == 2
         assert data[0]["tab_id"] == "p1"
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "compare_tabs"
         assert msg["params"]["tab_ids"] == ["p1", "p2"]
 
-    @pytest.mark.asyncio
     async def test_compare_tabs_too_few(self):
         result = await server.browser_compare_tabs("p1")
         assert "Error" in result
 
-    @pytest.mark.asyncio
     async def test_batch_navigate(self):
         resp = {"success": True, "tabs": [
             {"tab_id": "p1", "url": "https://a.com"},
             {"tab_id": "p2", "url": "https://b.com"},
         ]}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_batch_navigate("https://a.com,https://b.com")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["success"] is True
         assert len(data["tabs"]) == 2
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "batch_navigate"
         assert msg["params"]["urls"] == ["https://a.com", "https://b.com"]
         assert msg["params"]["persist"] is False
 
-    @pytest.mark.asyncio
     async def test_batch_navigate_persist(self):
         resp = {"success": True, "tabs": [
             {"tab_id": "p1", "url": "https://a.com"},
         ], "persist": True}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_batch_navigate("https://a.com", persist=True)
-        data = json.loads(result)
+        data = _loads(result)
         assert data["persist"] is True
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["persist"] is True
 
-    @pytest.mark.asyncio
     async def test_batch_navigate_empty(self):
         result = await server.browser_batch_navigate("")
         assert "Error" in result
@@ -1662,7 +1291,6 @@ class TestMultiTabCoordination:
 
 
 class TestVisualGrounding:
-    @pytest.mark.asyncio
     async def test_find_element_basic(self):
         dom = {
             "elements": [
@@ -1674,15 +1302,42 @@ class TestVisualGrounding:
             "url": "https://example.com",
             "title": "Test",
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_find_element_by_description("login button")
         assert "Matches for 'login button'" in result
         assert "[1]" in result  # Login button should be a top match
         assert "Login" in result
 
-    @pytest.mark.asyncio
-    async def test_find_element_no_match(self):
+    class _NoiseFuzz:
+        """Stand-in WRatio with rapidfuzz's noise behavior: unrelated
+        strings ("Home" vs "submit form") still score in the 30s."""
+
+        @staticmethod
+        def WRatio(a, b):
+            return 34.0
+
+    class _NoiseProcess:
+        """Stand-in process.cdist honoring rapidfuzz's score_cutoff
+        contract: sub-cutoff scores come back as 0."""
+
+        @staticmethod
+        def cdist(queries, choices, scorer=None, score_cutoff=0, workers=None):
+            noise = 34.0 if 34.0 >= score_cutoff else 0.0
+            return [[noise for _ in choices] for _ in queries]
+
+    # (fuzz, process) pairs selecting each scoring configuration. The
+    # stand-ins let the fuzzy paths run without rapidfuzz installed and
+    # pin the score floor: noise-level scores must not surface as matches.
+    _NO_MATCH_CONFIGS = [
+        ("substring", None, None),
+        ("wratio", _NoiseFuzz, None),
+        ("cdist", _NoiseFuzz, _NoiseProcess),
+    ]
+
+    @pytest.mark.parametrize("fuzz_impl,process_impl",
+                             [c[1:] for c in _NO_MATCH_CONFIGS],
+                             ids=[c[0] for c in _NO_MATCH_CONFIGS])
+    async def test_find_element_no_match(self, fuzz_impl, process_impl):
         dom = {
             "elements": [
                 {"index": 0, "tag": "a", "text": "Home", "attributes": {}},
@@ -1690,20 +1345,19 @@ class TestVisualGrounding:
             "url": "https://example.com",
             "title": "Test",
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_find_element_by_description("submit form")
+        with patch.object(server, "fuzz", fuzz_impl), \
+             patch.object(server, "process", process_impl), \
+             patch.object(server, "ahocorasick", None):
+            with use_ws(_R(dom)) as fake_ws:
+                result = await server.browser_find_element_by_description("submit form")
         assert "No elements match" in result
 
-    @pytest.mark.asyncio
     async def test_find_element_empty_page(self):
         dom = {"elements": [], "url": "", "title": ""}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_find_element_by_description("anything")
         assert "no interactive elements" in result
 
-    @pytest.mark.asyncio
     async def test_find_element_with_role(self):
         dom = {
             "elements": [
@@ -1713,8 +1367,7 @@ class TestVisualGrounding:
             "url": "https://example.com",
             "title": "Test",
         }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": dom}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(dom)) as fake_ws:
             result = await server.browser_find_element_by_description("navigation menu")
         assert "[0]" in result  # navigation div should match
 
@@ -1723,55 +1376,45 @@ class TestVisualGrounding:
 
 
 class TestActionRecording:
-    @pytest.mark.asyncio
     async def test_record_start(self):
         resp = {"success": True, "note": "Recording started"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_record_start()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "record_start"
 
-    @pytest.mark.asyncio
     async def test_record_stop(self):
         resp = {"success": True, "actions": 5}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_record_stop()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["actions"] == 5
 
-    @pytest.mark.asyncio
     async def test_record_save(self):
         resp = {"success": True, "file": "/tmp/rec.json", "actions": 5}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_record_save("/tmp/rec.json")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["actions"] == 5
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["file_path"] == "/tmp/rec.json"
 
-    @pytest.mark.asyncio
     async def test_record_replay(self):
         resp = {"success": True, "replayed": 5, "total": 5}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_record_replay("/tmp/rec.json", delay=0.1)
-        data = json.loads(result)
+        data = _loads(result)
         assert data["replayed"] == 5
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["params"]["delay"] == 0.1
 
-    @pytest.mark.asyncio
     async def test_record_replay_with_errors(self):
         resp = {"success": True, "replayed": 3, "total": 5, "errors": [{"method": "bad", "error": "failed"}]}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_record_replay("/tmp/rec.json")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["errors"] is not None
 
 
@@ -1779,118 +1422,77 @@ class TestActionRecording:
 
 
 class TestDrag:
-    @pytest.mark.asyncio
-    async def test_drag_element(self):
-        resp = {"success": True, "from": {"x": 100, "y": 100}, "to": {"x": 300, "y": 300}, "steps": 10, "source_tag": "div", "target_tag": "div"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_drag(0, 1)
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "drag_element"
-        assert msg["params"]["sourceIndex"] == 0
-        assert msg["params"]["targetIndex"] == 1
-
-    @pytest.mark.asyncio
-    async def test_drag_element_custom_steps(self):
-        resp = {"success": True, "steps": 5}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_drag(0, 1, steps=5)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["steps"] == 5
-
-    @pytest.mark.asyncio
-    async def test_drag_element_with_tab_id(self):
-        resp = {"success": True}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_drag(0, 1, tab_id="panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
-
-    @pytest.mark.asyncio
-    async def test_drag_element_with_frame_id(self):
-        resp = {"success": True}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_drag(0, 1, frame_id=42)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["frame_id"] == 42
-
-    @pytest.mark.asyncio
-    async def test_drag_coordinates(self):
-        resp = {"success": True, "from": {"x": 10, "y": 20}, "to": {"x": 300, "y": 400}, "steps": 10}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_drag_coordinates(10, 20, 300, 400)
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "drag_coordinates"
-        assert msg["params"]["startX"] == 10
-        assert msg["params"]["startY"] == 20
-        assert msg["params"]["endX"] == 300
-        assert msg["params"]["endY"] == 400
-
-    @pytest.mark.asyncio
-    async def test_drag_coordinates_custom_steps(self):
-        resp = {"success": True, "steps": 20}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_drag_coordinates(0, 0, 100, 100, steps=20)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["steps"] == 20
+    CASES = [
+        pytest.param(server.browser_drag, (0, 1), {},
+                     "drag_element", {"sourceIndex": 0, "targetIndex": 1},
+                     {"success": True, "from": {"x": 100, "y": 100},
+                      "to": {"x": 300, "y": 300}, "steps": 10,
+                      "source_tag": "div", "target_tag": "div"},
+                     id="drag_element"),
+        pytest.param(server.browser_drag, (0, 1), {"steps": 5},
+                     "drag_element", {"steps": 5},
+                     {"success": True, "steps": 5}, id="custom_steps"),
+        pytest.param(server.browser_drag, (0, 1), {"tab_id": "panel1"},
+                     "drag_element", {"tab_id": "panel1"},
+                     {"success": True}, id="with_tab_id"),
+        pytest.param(server.browser_drag, (0, 1), {"frame_id": 42},
+                     "drag_element", {"frame_id": 42},
+                     {"success": True}, id="with_frame_id"),
+        pytest.param(server.browser_drag_coordinates, (10, 20, 300, 400), {},
+                     "drag_coordinates",
+                     {"startX": 10, "startY": 20, "endX": 300, "endY": 400},
+                     {"success": True, "from": {"x": 10, "y": 20},
+                      "to": {"x": 300, "y": 400}, "steps": 10},
+                     id="drag_coordinates"),
+        pytest.param(server.browser_drag_coordinates, (0, 0, 100, 100),
+                     {"steps": 20}, "drag_coordinates", {"steps": 20},
+                     {"success": True, "steps": 20},
+                     id="coordinates_custom_steps"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
 
 # ── Phase 10: Chrome-Context Eval ────────────────────────────
 
 
 class TestChromeEval:
-    @pytest.mark.asyncio
     async def test_eval_chrome_simple(self):
         resp = {"result": "Zen"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_eval_chrome("Services.appinfo.name")
         assert "Zen" in result
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "eval_chrome"
         assert msg["params"]["expression"] == "Services.appinfo.name"
 
-    @pytest.mark.asyncio
     async def test_eval_chrome_error(self):
         resp = {"error": "ReferenceError: x is not defined", "stack": "line 1"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_eval_chrome("x.y.z")
         assert "Error:" in result
         assert "ReferenceError" in result
 
-    @pytest.mark.asyncio
     async def test_eval_chrome_complex_result(self):
         resp = {"result": {"name": "Zen", "version": "1.0", "tabs": [1, 2, 3]}}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_eval_chrome("({name: 'Zen', version: '1.0', tabs: [1,2,3]})")
-        data = json.loads(result)
+        data = _loads(result)
         assert data["name"] == "Zen"
         assert data["tabs"] == [1, 2, 3]
 
-    @pytest.mark.asyncio
     async def test_eval_chrome_number_result(self):
         resp = {"result": 42}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_eval_chrome("gBrowser.tabs.length")
         assert "42" in result
 
-    @pytest.mark.asyncio
     async def test_eval_chrome_null_result(self):
         resp = {"result": None}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(resp)) as fake_ws:
             result = await server.browser_eval_chrome("null")
         assert "null" in result
 
@@ -1899,73 +1501,94 @@ class TestChromeEval:
 
 
 class TestReflect:
-    @pytest.mark.asyncio
     async def test_reflect_basic(self):
-        # 1x1 white JPEG
-        tiny_jpeg = base64.b64encode(b'\xff\xd8\xff\xe0').decode()
-        fake_ws = FakeWebSocket(responses=[
-            {"id": "x", "result": {"image": f"data:image/jpeg;base64,{tiny_jpeg}"}},
-            {"id": "x", "result": {"text": "Example Domain"}},
-            {"id": "x", "result": {"url": "https://example.com", "title": "Example Domain", "loading": False}},
-        ])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[
+            {"id": "x", "result": {
+                "image": _TINY_JPEG_DATA_URL,
+                "text": "Example Domain",
+                "url": "https://example.com", "title": "Example Domain", "loading": False,
+            }},
+        ]) as fake_ws:
             result = await server.browser_reflect()
         assert isinstance(result, list)
         assert len(result) == 2
         assert isinstance(result[0], Image)
         assert "URL: https://example.com" in result[1]
         assert "Example Domain" in result[1]
+        # Fused opcode: the whole reflection is a single round-trip
+        assert len(fake_ws.sent) == 1
+        assert fake_ws.last_msg["method"] == "reflect"
 
-    @pytest.mark.asyncio
     async def test_reflect_with_goal(self):
-        tiny_jpeg = base64.b64encode(b'\xff\xd8\xff\xe0').decode()
-        fake_ws = FakeWebSocket(responses=[
-            {"id": "x", "result": {"image": f"data:image/jpeg;base64,{tiny_jpeg}"}},
-            {"id": "x", "result": {"text": "Page content"}},
-            {"id": "x", "result": {"url": "https://example.com", "title": "Test", "loading": False}},
-        ])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[
+            {"id": "x", "result": {
+                "image": _TINY_JPEG_DATA_URL,
+                "text": "Page content",
+                "url": "https://example.com", "title": "Test", "loading": False,
+            }},
+        ]) as fake_ws:
             result = await server.browser_reflect(goal="find the login button")
         assert "Goal: find the login button" in result[1]
 
-    @pytest.mark.asyncio
     async def test_reflect_no_screenshot(self):
-        fake_ws = FakeWebSocket(responses=[
-            {"id": "x", "result": {"image": ""}},
-            {"id": "x", "result": {"text": "Page text here"}},
-            {"id": "x", "result": {"url": "https://example.com", "title": "Test", "loading": False}},
-        ])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[
+            {"id": "x", "result": {
+                "image": "",
+                "text": "Page text here",
+                "url": "https://example.com", "title": "Test", "loading": False,
+            }},
+        ]) as fake_ws:
             result = await server.browser_reflect()
         # Should only have 1 block (text), no Image
         assert len(result) == 1
         assert "Page text here" in result[0]
 
-    @pytest.mark.asyncio
     async def test_reflect_with_tab_id(self):
-        tiny_jpeg = base64.b64encode(b'\xff\xd8\xff\xe0').decode()
-        fake_ws = FakeWebSocket(responses=[
-            {"id": "x", "result": {"image": f"data:image/jpeg;base64,{tiny_jpeg}"}},
-            {"id": "x", "result": {"text": "text"}},
-            {"id": "x", "result": {"url": "https://example.com", "title": "Test", "loading": False}},
-        ])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[
+            {"id": "x", "result": {
+                "image": _TINY_JPEG_DATA_URL,
+                "text": "text",
+                "url": "https://example.com", "title": "Test", "loading": False,
+            }},
+        ]) as fake_ws:
             await server.browser_reflect(tab_id="panel1")
-        # All 3 commands should have tab_id
-        for sent in fake_ws.sent:
-            msg = json.loads(sent)
-            assert msg["params"]["tab_id"] == "panel1"
+        msg = fake_ws.last_msg
+        assert msg["params"]["tab_id"] == "panel1"
+
+    async def test_reflect_without_text(self):
+        """include_text=False is forwarded so the browser skips text extraction."""
+        with use_ws(responses=[
+            {"id": "x", "result": {
+                "image": _TINY_JPEG_DATA_URL,
+                "url": "https://example.com", "title": "Test", "loading": False,
+            }},
+        ]) as fake_ws:
+            result = await server.browser_reflect(include_text=False)
+        msg = fake_ws.last_msg
+        assert msg["params"]["include_text"] is False
+        assert "Page Text" not in result[1]
+
+    async def test_reflect_sends_text_limit(self):
+        """text_limit is forwarded to the browser-side reflect opcode."""
+        with use_ws(responses=[
+            {"id": "x", "result": {
+                "image": _TINY_JPEG_DATA_URL,
+                "text": "short",
+                "url": "https://example.com", "title": "Test", "loading": False,
+            }},
+        ]) as fake_ws:
+            await server.browser_reflect(text_limit=1000)
+        msg = fake_ws.last_msg
+        assert msg["params"]["text_limit"] == 1000
 
-    @pytest.mark.asyncio
     async def test_reflect_truncates_text(self):
-        long_text = "x" * 100000
-        tiny_jpeg = base64.b64encode(b'\xff\xd8\xff\xe0').decode()
-        fake_ws = FakeWebSocket(responses=[
-            {"id": "x", "result": {"image": f"data:image/jpeg;base64,{tiny_jpeg}"}},
-            {"id": "x", "result": {"text": long_text}},
-            {"id": "x", "result": {"url": "https://example.com", "title": "Test", "loading": False}},
-        ])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(responses=[
+            {"id": "x", "result": {
+                "image": _TINY_JPEG_DATA_URL,
+                "text": _LONG_TEXT,
+                "url": "https://example.com", "title": "Test", "loading": False,
+            }},
+        ]) as fake_ws:
             result = await server.browser_reflect()
         # Text block should be truncated (50K chars of x's + header lines)
         text_block = result[1]
@@ -1977,53 +1600,42 @@ class TestReflect:
 
 
 class TestFileUpload:
-    @pytest.mark.asyncio
-    async def test_file_upload_basic(self):
-        resp = {"success": True, "file_name": "photo.jpg", "file_size": 12345, "file_type": "image/jpeg"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_file_upload("/tmp/photo.jpg", 3)
-        data = json.loads(result)
-        assert data["success"] is True
-        assert data["file_name"] == "photo.jpg"
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "file_upload"
-        assert msg["params"]["file_path"] == "/tmp/photo.jpg"
-        assert msg["params"]["index"] == 3
-
-    @pytest.mark.asyncio
-    async def test_file_upload_with_tab_id(self):
-        resp = {"success": True, "file_name": "doc.pdf", "file_size": 5000, "file_type": "application/pdf"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_file_upload("/tmp/doc.pdf", 5, tab_id="panel1")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "panel1"
+    CASES = [
+        pytest.param(server.browser_file_upload, ("/tmp/photo.jpg", 3), {},
+                     "file_upload",
+                     {"file_path": "/tmp/photo.jpg", "index": 3},
+                     {"success": True, "file_name": "photo.jpg",
+                      "file_size": 12345, "file_type": "image/jpeg"},
+                     id="basic"),
+        pytest.param(server.browser_file_upload, ("/tmp/doc.pdf", 5),
+                     {"tab_id": "panel1"}, "file_upload",
+                     {"tab_id": "panel1"},
+                     {"success": True, "file_name": "doc.pdf",
+                      "file_size": 5000, "file_type": "application/pdf"},
+                     id="with_tab_id"),
+        pytest.param(server.browser_file_upload, ("/tmp/img.png", 2),
+                     {"frame_id": 42}, "file_upload", {"frame_id": 42},
+                     {"success": True, "file_name": "img.png",
+                      "file_size": 1000, "file_type": "image/png"},
+                     id="with_frame_id"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
-    @pytest.mark.asyncio
-    async def test_file_upload_with_frame_id(self):
-        resp = {"success": True, "file_name": "img.png", "file_size": 1000, "file_type": "image/png"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_file_upload("/tmp/img.png", 2, frame_id=42)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["frame_id"] == 42
-
-    @pytest.mark.asyncio
     async def test_file_upload_file_not_found(self):
-        fake_ws = FakeWebSocket(
+        with use_ws(
             responses=[{"id": "x", "error": {"message": "File not found: /bad/path"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        ) as fake_ws:
             with pytest.raises(Exception, match="File not found"):
                 await server.browser_file_upload("/bad/path", 0)
 
-    @pytest.mark.asyncio
     async def test_file_upload_wrong_element_type(self):
-        fake_ws = FakeWebSocket(
+        with use_ws(
             responses=[{"id": "x", "error": {"message": "Element [0] is <input type=text>, not <input type=\"file\">"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        ) as fake_ws:
             with pytest.raises(Exception, match="not.*file"):
                 await server.browser_file_upload("/tmp/photo.jpg", 0)
 
@@ -2032,73 +1644,52 @@ class TestFileUpload:
 
 
 class TestWaitForDownload:
-    @pytest.mark.asyncio
-    async def test_wait_for_download_basic(self):
-        resp = {
-            "success": True, "file_path": "/Users/user/Downloads/report.pdf",
-            "file_name": "report.pdf", "file_size": 50000, "content_type": "application/pdf"
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_wait_for_download()
-        data = json.loads(result)
-        assert data["success"] is True
-        assert data["file_name"] == "report.pdf"
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["method"] == "wait_for_download"
-        assert msg["params"]["timeout"] == 60
-
-    @pytest.mark.asyncio
-    async def test_wait_for_download_custom_timeout(self):
-        resp = {"success": True, "file_path": "/tmp/file.zip", "file_name": "file.zip", "file_size": 100000, "content_type": "application/zip"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_wait_for_download(timeout=30)
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["timeout"] == 30
-
-    @pytest.mark.asyncio
-    async def test_wait_for_download_with_save_to(self):
-        resp = {"success": True, "file_path": "/tmp/saved.pdf", "file_name": "saved.pdf", "file_size": 50000, "content_type": "application/pdf"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            await server.browser_wait_for_download(save_to="/tmp/saved.pdf")
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["save_to"] == "/tmp/saved.pdf"
-
-    @pytest.mark.asyncio
-    async def test_wait_for_download_timeout(self):
-        resp = {"success": False, "error": "Timeout: no download completed within 5s", "timeout": True}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_wait_for_download(timeout=5)
-        data = json.loads(result)
-        assert data["success"] is False
-        assert data["timeout"] is True
-
-    @pytest.mark.asyncio
-    async def test_wait_for_download_failure(self):
-        resp = {"success": False, "error": "Network error", "file_path": "/tmp/partial.zip"}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_wait_for_download()
-        data = json.loads(result)
-        assert data["success"] is False
-        assert "Network error" in data["error"]
-
-    @pytest.mark.asyncio
-    async def test_wait_for_download_save_to_error(self):
-        resp = {
-            "success": True, "file_path": "/Users/user/Downloads/file.pdf",
-            "save_to_error": "Permission denied", "file_name": "file.pdf",
-            "file_size": 50000, "content_type": "application/pdf"
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_wait_for_download(save_to="/restricted/path")
-        data = json.loads(result)
-        assert data["success"] is True
-        assert "save_to_error" in data
+    CASES = [
+        pytest.param(server.browser_wait_for_download, (), {},
+                     "wait_for_download", {"timeout": 60},
+                     {"success": True,
+                      "file_path": "/Users/user/Downloads/report.pdf",
+                      "file_name": "report.pdf", "file_size": 50000,
+                      "content_type": "application/pdf"},
+                     id="basic"),
+        pytest.param(server.browser_wait_for_download, (), {"timeout": 30},
+                     "wait_for_download", {"timeout": 30},
+                     {"success": True, "file_path": "/tmp/file.zip",
+                      "file_name": "file.zip", "file_size": 100000,
+                      "content_type": "application/zip"},
+                     id="custom_timeout"),
+        pytest.param(server.browser_wait_for_download, (),
+                     {"save_to": "/tmp/saved.pdf"},
+                     "wait_for_download", {"save_to": "/tmp/saved.pdf"},
+                     {"success": True, "file_path": "/tmp/saved.pdf",
+                      "file_name": "saved.pdf", "file_size": 50000,
+                      "content_type": "application/pdf"},
+                     id="with_save_to"),
+        pytest.param(server.browser_wait_for_download, (), {"timeout": 5},
+                     "wait_for_download", {"timeout": 5},
+                     {"success": False, "timeout": True,
+                      "error": "Timeout: no download completed within 5s"},
+                     id="timeout"),
+        pytest.param(server.browser_wait_for_download, (), {},
+                     "wait_for_download", {},
+                     {"success": False, "error": "Network error",
+                      "file_path": "/tmp/partial.zip"},
+                     id="failure"),
+        pytest.param(server.browser_wait_for_download, (),
+                     {"save_to": "/restricted/path"},
+                     "wait_for_download", {"save_to": "/restricted/path"},
+                     {"success": True,
+                      "file_path": "/Users/user/Downloads/file.pdf",
+                      "save_to_error": "Permission denied",
+                      "file_name": "file.pdf", "file_size": 50000,
+                      "content_type": "application/pdf"},
+                     id="save_to_error"),
+    ]
+
+    @pytest.mark.parametrize("fn,args,kwargs,method,expected,result", CASES)
+    async def test_envelope_and_passthrough(self, fn, args, kwargs, method,
+                                            expected, result):
+        await _check_envelope(fn, args, kwargs, method, expected, result)
 
 
 # ── Phase 12: Session URL Routing ─────────────────────────────
@@ -2107,98 +1698,62 @@ class TestWaitForDownload:
 class TestGetWsSessionRouting:
     """Tests for URL-based session routing in get_ws()."""
 
-    @pytest.mark.asyncio
     async def test_new_session_url(self):
         """Without ZENLEAP_SESSION_ID, connects to /new."""
-        server._ws_connection = None
-        server._session_id = None
         fake_ws = FakeWebSocket(
             response_headers={"X-ZenLeap-Session": "abc-1234"}
         )
+        calls = []
         with patch.object(server, "SESSION_ID", ""), \
-             patch("websockets.connect", new_callable=AsyncMock, return_value=fake_ws) as mock_connect:
+             patch("websockets.connect", new=_connect_stub(fake_ws, calls)):
             ws = await server.get_ws()
         assert ws is fake_ws
-        mock_connect.assert_called_once_with(
-            "ws://localhost:9876/new",
-            max_size=10 * 1024 * 1024,
-            ping_interval=30,
-            ping_timeout=120,
-        )
+        assert calls == [(("ws://localhost:9876/new",), _CONNECT_KWARGS)]
         assert server._session_id == "abc-1234"
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_join_session_url(self):
         """With ZENLEAP_SESSION_ID set, connects to /session/<id>."""
-        server._ws_connection = None
-        server._session_id = None
         fake_ws = FakeWebSocket(
             response_headers={"X-ZenLeap-Session": "existing-session"}
         )
+        calls = []
         with patch.object(server, "SESSION_ID", "existing-session"), \
-             patch("websockets.connect", new_callable=AsyncMock, return_value=fake_ws) as mock_connect:
+             patch("websockets.connect", new=_connect_stub(fake_ws, calls)):
             ws = await server.get_ws()
         assert ws is fake_ws
-        mock_connect.assert_called_once_with(
-            "ws://localhost:9876/session/existing-session",
-            max_size=10 * 1024 * 1024,
-            ping_interval=30,
-            ping_timeout=120,
-        )
+        assert calls == [
+            (("ws://localhost:9876/session/existing-session",), _CONNECT_KWARGS)
+        ]
         assert server._session_id == "existing-session"
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_custom_ws_url(self):
         """ZENLEAP_WS_URL is respected in URL construction."""
-        server._ws_connection = None
-        server._session_id = None
         fake_ws = FakeWebSocket()
+        calls = []
         with patch.object(server, "SESSION_ID", ""), \
              patch.object(server, "BROWSER_WS_URL", "ws://remote:1234"), \
-             patch("websockets.connect", new_callable=AsyncMock, return_value=fake_ws) as mock_connect:
+             patch("websockets.connect", new=_connect_stub(fake_ws, calls)):
             ws = await server.get_ws()
-        mock_connect.assert_called_once_with(
-            "ws://remote:1234/new",
-            max_size=10 * 1024 * 1024,
-            ping_interval=30,
-            ping_timeout=120,
-        )
-        server._ws_connection = None
-        server._session_id = None
+        assert calls == [(("ws://remote:1234/new",), _CONNECT_KWARGS)]
 
-    @pytest.mark.asyncio
     async def test_session_id_extracted_from_headers(self):
         """X-ZenLeap-Session header is stored in _session_id."""
-        server._ws_connection = None
-        server._session_id = None
         fake_ws = FakeWebSocket(
             response_headers={"X-ZenLeap-Session": "sess-xyz"}
         )
         with patch.object(server, "SESSION_ID", ""), \
-             patch("websockets.connect", new_callable=AsyncMock, return_value=fake_ws):
+             patch("websockets.connect", new=_connect_stub(fake_ws)):
             await server.get_ws()
         assert server._session_id == "sess-xyz"
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_session_id_none_when_no_header(self):
         """When no X-ZenLeap-Session header, _session_id stays None."""
-        server._ws_connection = None
-        server._session_id = None
         fake_ws = FakeWebSocket(response_headers={})
         with patch.object(server, "SESSION_ID", ""), \
-             patch("websockets.connect", new_callable=AsyncMock, return_value=fake_ws):
+             patch("websockets.connect", new=_connect_stub(fake_ws)):
             await server.get_ws()
         assert server._session_id is None
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_reconnect_uses_saved_session_id(self):
         """When connection dies, reconnects to same session using saved _session_id."""
         dead_ws = FakeWebSocket()
@@ -2209,22 +1764,17 @@ class TestGetWsSessionRouting:
         new_ws = FakeWebSocket(
             response_headers={"X-ZenLeap-Session": "old-session"}
         )
+        calls = []
         with patch.object(server, "SESSION_ID", ""), \
-             patch("websockets.connect", new_callable=AsyncMock, return_value=new_ws) as mock_connect:
+             patch("websockets.connect", new=_connect_stub(new_ws, calls)):
             ws = await server.get_ws()
         assert ws is new_ws
         # Should reconnect to /session/old-session, NOT /new
-        mock_connect.assert_called_once_with(
-            "ws://localhost:9876/session/old-session",
-            max_size=10 * 1024 * 1024,
-            ping_interval=30,
-            ping_timeout=120,
-        )
+        assert calls == [
+            (("ws://localhost:9876/session/old-session",), _CONNECT_KWARGS)
+        ]
         assert server._session_id == "old-session"
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_reconnect_fallback_to_new_on_404(self):
         """If saved session was destroyed (404), falls back to creating a new one."""
         server._ws_connection = None
@@ -2242,489 +1792,395 @@ class TestGetWsSessionRouting:
             return new_ws
 
         with patch.object(server, "SESSION_ID", ""), \
-             patch("websockets.connect", side_effect=mock_connect):
+             patch("websockets.connect", new=mock_connect):
             ws = await server.get_ws()
         assert ws is new_ws
         assert len(connect_calls) == 2
         assert connect_calls[0] == "ws://localhost:9876/session/dead-session"
         assert connect_calls[1] == "ws://localhost:9876/new"
         assert server._session_id == "fresh-session"
-        server._ws_connection = None
-        server._session_id = None
 
-    @pytest.mark.asyncio
     async def test_no_response_attribute(self):
         """Gracefully handles ws without response attribute."""
-        server._ws_connection = None
-        server._session_id = None
         fake_ws = FakeWebSocket()
         del fake_ws.response  # simulate websockets without response
         with patch.object(server, "SESSION_ID", ""), \
-             patch("websockets.connect", new_callable=AsyncMock, return_value=fake_ws):
+             patch("websockets.connect", new=_connect_stub(fake_ws)):
             ws = await server.get_ws()
         assert ws is fake_ws
         assert server._session_id is None
-        server._ws_connection = None
-        server._session_id = None
 
 
 # ── Phase 12: Session Management Tools ────────────────────────
 
 
+# Error-message patterns for pytest.raises(match=...), compiled once:
+# re.search fast-paths a precompiled pattern, and a couple of these
+# recur across the session/claiming error tests.
+_ERR_SESSION_EXPIRED = re.compile("Session expired")
+_ERR_SESSION_NOT_FOUND = re.compile("Session not found")
+_ERR_WORKSPACE_NOT_FOUND = re.compile("Workspace not found")
+_ERR_ACTIVELY_OWNED = re.compile("actively owned")
+_ERR_TAB_NOT_FOUND = re.compile("Tab not found")
+_ERR_TAB_LIMIT = re.compile("tab limit exceeded")
+
+
 class TestSessionManagement:
     """Tests for session_info, session_close, list_sessions MCP tools."""
 
-    @pytest.mark.asyncio
-    async def test_session_info(self):
-        resp = {
+    # Canned results, built once at class creation instead of per test.
+    # FakeWebSocket only ever encodes them, so sharing refs is safe.
+    INFO_RESP = {
+        "session_id": "abc-1234",
+        "workspace_name": "Zen AI Agent",
+        "workspace_id": "ws-uuid",
+        "connection_id": "conn-1",
+        "connection_count": 2,
+        "tab_count": 3,
+        "claimed_tab_count": 1,
+        "created_at": 1700000000000,
+    }
+    CLOSE_RESP = {"success": True, "session_id": "abc-1234",
+                  "tabs_closed": 3, "tabs_released": 2}
+    SESSIONS_RESP = [
+        {
             "session_id": "abc-1234",
             "workspace_name": "Zen AI Agent",
-            "workspace_id": "ws-uuid",
-            "connection_id": "conn-1",
-            "connection_count": 2,
-            "tab_count": 3,
-            "claimed_tab_count": 1,
+            "connection_count": 1,
+            "tab_count": 2,
             "created_at": 1700000000000,
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        },
+        {
+            "session_id": "def-5678",
+            "workspace_name": "Zen AI Agent",
+            "connection_count": 3,
+            "tab_count": 5,
+            "created_at": 1700001000000,
+        },
+    ]
+
+    async def test_session_info(self):
+        with use_ws(_R(self.INFO_RESP)) as fake_ws:
             result = await server.browser_session_info()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["session_id"] == "abc-1234"
         assert data["workspace_name"] == "Zen AI Agent"
         assert data["connection_count"] == 2
         assert data["tab_count"] == 3
         assert data["claimed_tab_count"] == 1
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "session_info"
 
-    @pytest.mark.asyncio
     async def test_session_close(self):
-        resp = {"success": True, "session_id": "abc-1234", "tabs_closed": 3, "tabs_released": 2}
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.CLOSE_RESP)) as fake_ws:
             result = await server.browser_session_close()
-        data = json.loads(result)
+        data = _loads(result)
         assert data["success"] is True
         assert data["tabs_closed"] == 3
         assert data["tabs_released"] == 2
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "session_close"
 
-    @pytest.mark.asyncio
     async def test_list_sessions(self):
-        resp = [
-            {
-                "session_id": "abc-1234",
-                "workspace_name": "Zen AI Agent",
-                "connection_count": 1,
-                "tab_count": 2,
-                "created_at": 1700000000000,
-            },
-            {
-                "session_id": "def-5678",
-                "workspace_name": "Zen AI Agent",
-                "connection_count": 3,
-                "tab_count": 5,
-                "created_at": 1700001000000,
-            },
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.SESSIONS_RESP)) as fake_ws:
             result = await server.browser_list_sessions()
-        data = json.loads(result)
+        data = _loads(result)
         assert len(data) == 2
         assert data[0]["session_id"] == "abc-1234"
         assert data[1]["session_id"] == "def-5678"
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "list_sessions"
 
-    @pytest.mark.asyncio
     async def test_list_sessions_empty(self):
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": []}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R([])) as fake_ws:
             result = await server.browser_list_sessions()
-        data = json.loads(result)
+        data = _loads(result)
         assert data == []
 
-    @pytest.mark.asyncio
-    async def test_session_info_error(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "error": {"message": "Session expired"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            with pytest.raises(Exception, match="Session expired"):
-                await server.browser_session_info()
-
-    @pytest.mark.asyncio
-    async def test_session_close_already_closed(self):
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "error": {"message": "Session not found"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            with pytest.raises(Exception, match="Session not found"):
-                await server.browser_session_close()
-
-
 # ── Tab Claiming (Phase 13) ──────────────────────────────────────
 
 
 class TestListWorkspaceTabs:
     """Tests for browser_list_workspace_tabs tool."""
 
-    @pytest.mark.asyncio
+    # Canned workspace listings, built once at class creation.
+    ALL_TABS_RESP = [
+        {
+            "tab_id": "panel1",
+            "title": "Agent Tab",
+            "url": "https://agent.example.com",
+            "ownership": "owned",
+            "is_mine": True,
+        },
+        {
+            "tab_id": "panel2",
+            "title": "User Tab",
+            "url": "https://user.example.com",
+            "ownership": "unclaimed",
+            "is_mine": False,
+        },
+        {
+            "tab_id": "panel3",
+            "title": "Stale Tab",
+            "url": "https://stale.example.com",
+            "ownership": "stale",
+            "is_mine": False,
+            "owner_session_id": "old-session-id",
+        },
+    ]
+    OWNERSHIP_RESP = [
+        {"tab_id": "p1", "title": "T1", "url": "u1", "ownership": "owned", "is_mine": True},
+        {"tab_id": "p2", "title": "T2", "url": "u2", "ownership": "unclaimed", "is_mine": False},
+        {"tab_id": "p3", "title": "T3", "url": "u3", "ownership": "stale", "is_mine": False,
+         "owner_session_id": "stale-sess"},
+    ]
+    IS_MINE_RESP = [
+        {"tab_id": "p1", "title": "My Tab", "url": "u1", "ownership": "owned", "is_mine": True},
+        {"tab_id": "p2", "title": "Not Mine", "url": "u2", "ownership": "owned", "is_mine": False,
+         "owner_session_id": "other-session"},
+    ]
+    CLAIMED_RESP = [
+        {"tab_id": "p1", "title": "Created", "url": "u1", "ownership": "owned",
+         "is_mine": True, "claimed": False},
+        {"tab_id": "p2", "title": "Claimed", "url": "u2", "ownership": "owned",
+         "is_mine": True, "claimed": True},
+        {"tab_id": "p3", "title": "Foreign", "url": "u3", "ownership": "unclaimed",
+         "is_mine": False},
+    ]
+    OWNER_ID_RESP = [
+        {"tab_id": "p1", "title": "Mine", "url": "u1", "ownership": "owned", "is_mine": True},
+        {"tab_id": "p2", "title": "Foreign", "url": "u2", "ownership": "stale", "is_mine": False,
+         "owner_session_id": "foreign-sess"},
+    ]
+
     async def test_lists_all_workspace_tabs(self):
         """Should return all tabs in the workspace including unclaimed ones."""
-        resp = [
-            {
-                "tab_id": "panel1",
-                "title": "Agent Tab",
-                "url": "https://agent.example.com",
-                "ownership": "owned",
-                "is_mine": True,
-            },
-            {
-                "tab_id": "panel2",
-                "title": "User Tab",
-                "url": "https://user.example.com",
-                "ownership": "unclaimed",
-                "is_mine": False,
-            },
-            {
-                "tab_id": "panel3",
-                "title": "Stale Tab",
-                "url": "https://stale.example.com",
-                "ownership": "stale",
-                "is_mine": False,
-                "owner_session_id": "old-session-id",
-            },
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.ALL_TABS_RESP)) as fake_ws:
             result = await server.browser_list_workspace_tabs()
-        data = json.loads(result)
+        data = _loads(result)
         assert len(data) == 3
-        msg = json.loads(fake_ws.sent[0])
+        msg = fake_ws.last_msg
         assert msg["method"] == "list_workspace_tabs"
 
-    @pytest.mark.asyncio
     async def test_ownership_field_values(self):
         """Each tab should have a valid ownership field."""
-        resp = [
-            {"tab_id": "p1", "title": "T1", "url": "u1", "ownership": "owned", "is_mine": True},
-            {"tab_id": "p2", "title": "T2", "url": "u2", "ownership": "unclaimed", "is_mine": False},
-            {"tab_id": "p3", "title": "T3", "url": "u3", "ownership": "stale", "is_mine": False,
-             "owner_session_id": "stale-sess"},
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.OWNERSHIP_RESP)) as fake_ws:
             result = await server.browser_list_workspace_tabs()
-        data = json.loads(result)
+        data = _loads(result)
         statuses = {t["ownership"] for t in data}
         assert statuses == {"owned", "unclaimed", "stale"}
 
-    @pytest.mark.asyncio
     async def test_is_mine_field(self):
         """The is_mine field should indicate ownership by calling session."""
-        resp = [
-            {"tab_id": "p1", "title": "My Tab", "url": "u1", "ownership": "owned", "is_mine": True},
-            {"tab_id": "p2", "title": "Not Mine", "url": "u2", "ownership": "owned", "is_mine": False,
-             "owner_session_id": "other-session"},
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.IS_MINE_RESP)) as fake_ws:
             result = await server.browser_list_workspace_tabs()
-        data = json.loads(result)
+        data = _loads(result)
         assert data[0]["is_mine"] is True
         assert data[1]["is_mine"] is False
 
-    @pytest.mark.asyncio
     async def test_claimed_field_for_owned_tabs(self):
         """Tabs owned by calling session should include claimed status."""
-        resp = [
-            {"tab_id": "p1", "title": "Created", "url": "u1", "ownership": "owned",
-             "is_mine": True, "claimed": False},
-            {"tab_id": "p2", "title": "Claimed", "url": "u2", "ownership": "owned",
-             "is_mine": True, "claimed": True},
-            {"tab_id": "p3", "title": "Foreign", "url": "u3", "ownership": "unclaimed",
-             "is_mine": False},
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.CLAIMED_RESP)) as fake_ws:
             result = await server.browser_list_workspace_tabs()
-        data = json.loads(result)
+        data = _loads(result)
         assert data[0]["claimed"] is False
         assert data[1]["claimed"] is True
         assert "claimed" not in data[2]
 
-    @pytest.mark.asyncio
     async def test_empty_workspace(self):
         """Should return empty list when workspace has no tabs."""
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": []}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R([])) as fake_ws:
             result = await server.browser_list_workspace_tabs()
-        data = json.loads(result)
+        data = _loads(result)
         assert data == []
 
-    @pytest.mark.asyncio
     async def test_owner_session_id_only_for_foreign_tabs(self):
         """owner_session_id should only appear for tabs NOT owned by the caller."""
-        resp = [
-            {"tab_id": "p1", "title": "Mine", "url": "u1", "ownership": "owned", "is_mine": True},
-            {"tab_id": "p2", "title": "Foreign", "url": "u2", "ownership": "stale", "is_mine": False,
-             "owner_session_id": "foreign-sess"},
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.OWNER_ID_RESP)) as fake_ws:
             result = await server.browser_list_workspace_tabs()
-        data = json.loads(result)
+        data = _loads(result)
         assert "owner_session_id" not in data[0]
         assert data[1]["owner_session_id"] == "foreign-sess"
 
-    @pytest.mark.asyncio
-    async def test_error_propagation(self):
-        """Should propagate browser errors."""
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "error": {"message": "Workspace not found"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            with pytest.raises(Exception, match="Workspace not found"):
-                await server.browser_list_workspace_tabs()
-
-
 class TestClaimTab:
     """Tests for browser_claim_tab tool."""
 
-    @pytest.mark.asyncio
-    async def test_claim_unclaimed_tab(self):
-        """Should successfully claim an unclaimed (user-opened) tab."""
-        resp = {
-            "success": True,
-            "tab_id": "panel2",
-            "url": "https://user.example.com",
-            "title": "User Tab",
-            "previous_owner": None,
-            "was_stale": False,
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_claim_tab("panel2")
-        data = json.loads(result)
-        assert data["success"] is True
-        assert data["tab_id"] == "panel2"
-        assert data["previous_owner"] is None
-        assert data["was_stale"] is False
-        msg = json.loads(fake_ws.sent[0])
+    # (id, tab_id, canned claim_tab result, fields the decoded result
+    # must carry). The success variants only differ in these three
+    # pieces, so one parametrized body covers them all.
+    CASES = [
+        ("unclaimed",
+         "panel2",
+         {"success": True, "tab_id": "panel2",
+          "url": "https://user.example.com", "title": "User Tab",
+          "previous_owner": None, "was_stale": False},
+         {"success": True, "tab_id": "panel2",
+          "previous_owner": None, "was_stale": False}),
+        ("stale",
+         "panel3",
+         {"success": True, "tab_id": "panel3",
+          "url": "https://stale.example.com", "title": "Stale Tab",
+          "previous_owner": "old-session-123", "was_stale": True},
+         {"success": True, "was_stale": True,
+          "previous_owner": "old-session-123"}),
+        ("already_owned",
+         "panel1",
+         {"success": True, "tab_id": "panel1", "already_owned": True},
+         {"success": True, "already_owned": True}),
+        ("by_url",
+         "https://example.com/page",
+         {"success": True, "tab_id": "panel-auto",
+          "url": "https://example.com/page", "title": "Example",
+          "previous_owner": None, "was_stale": False},
+         {"success": True}),
+        ("metadata",
+         "panel-x",
+         {"success": True, "tab_id": "panel-x",
+          "url": "https://docs.example.com", "title": "Documentation",
+          "previous_owner": None, "was_stale": False},
+         {"url": "https://docs.example.com", "title": "Documentation"}),
+    ]
+
+    @pytest.mark.parametrize("tab_id,resp,expected",
+                             [c[1:] for c in CASES],
+                             ids=[c[0] for c in CASES])
+    async def test_claim_variants(self, tab_id, resp, expected):
+        """Unclaimed/stale/already-owned/by-URL claims share one shape:
+        send claim_tab with the tab_id, pass the result through."""
+        with use_ws(_R(resp)) as fake_ws:
+            result = await server.browser_claim_tab(tab_id)
+        data = _loads(result)
+        assert expected.items() <= data.items()
+        msg = fake_ws.last_msg
         assert msg["method"] == "claim_tab"
-        assert msg["params"]["tab_id"] == "panel2"
-
-    @pytest.mark.asyncio
-    async def test_claim_stale_tab(self):
-        """Should successfully claim a tab from a stale session."""
-        resp = {
-            "success": True,
-            "tab_id": "panel3",
-            "url": "https://stale.example.com",
-            "title": "Stale Tab",
-            "previous_owner": "old-session-123",
-            "was_stale": True,
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_claim_tab("panel3")
-        data = json.loads(result)
-        assert data["success"] is True
-        assert data["was_stale"] is True
-        assert data["previous_owner"] == "old-session-123"
-
-    @pytest.mark.asyncio
-    async def test_claim_already_owned_tab(self):
-        """Claiming a tab already owned by calling session should return already_owned."""
-        resp = {
-            "success": True,
-            "tab_id": "panel1",
-            "already_owned": True,
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_claim_tab("panel1")
-        data = json.loads(result)
-        assert data["success"] is True
-        assert data["already_owned"] is True
-
-    @pytest.mark.asyncio
-    async def test_claim_actively_owned_tab_fails(self):
-        """Claiming a tab actively owned by another session should fail."""
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "error": {"message": "Tab is actively owned by session abc. Cannot claim tabs from active sessions."}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            with pytest.raises(Exception, match="actively owned"):
-                await server.browser_claim_tab("panel1")
-
-    @pytest.mark.asyncio
-    async def test_claim_nonexistent_tab_fails(self):
-        """Claiming a tab that doesn't exist should fail."""
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "error": {"message": "Tab not found in workspace: bad-id"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            with pytest.raises(Exception, match="Tab not found"):
-                await server.browser_claim_tab("bad-id")
-
-    @pytest.mark.asyncio
-    async def test_claim_by_url(self):
-        """Should support claiming tabs by URL."""
-        resp = {
-            "success": True,
-            "tab_id": "panel-auto",
-            "url": "https://example.com/page",
-            "title": "Example",
-            "previous_owner": None,
-            "was_stale": False,
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_claim_tab("https://example.com/page")
-        data = json.loads(result)
-        assert data["success"] is True
-        msg = json.loads(fake_ws.sent[0])
-        assert msg["params"]["tab_id"] == "https://example.com/page"
-
-    @pytest.mark.asyncio
-    async def test_claim_respects_session_tab_limit(self):
-        """Should fail if session tab limit would be exceeded."""
-        fake_ws = FakeWebSocket(
-            responses=[{"id": "x", "error": {"message": "Session tab limit exceeded: 40/40 open, requested 1 more"}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            with pytest.raises(Exception, match="tab limit exceeded"):
-                await server.browser_claim_tab("panel5")
-
-    @pytest.mark.asyncio
-    async def test_claim_returns_tab_metadata(self):
-        """Claimed tab response should include url and title."""
-        resp = {
-            "success": True,
-            "tab_id": "panel-x",
-            "url": "https://docs.example.com",
-            "title": "Documentation",
-            "previous_owner": None,
-            "was_stale": False,
-        }
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
-            result = await server.browser_claim_tab("panel-x")
-        data = json.loads(result)
-        assert data["url"] == "https://docs.example.com"
-        assert data["title"] == "Documentation"
+        assert msg["params"]["tab_id"] == tab_id
+
+class TestSessionToolErrors:
+    """Browser-reported errors raise from the session/claiming tools.
+
+    All six error paths share one shape — canned error frame in,
+    matching exception out — so they run as a single table."""
+
+    CASES = [
+        ("session_expired", server.browser_session_info, (),
+         "Session expired", _ERR_SESSION_EXPIRED),
+        ("session_closed", server.browser_session_close, (),
+         "Session not found", _ERR_SESSION_NOT_FOUND),
+        ("workspace_missing", server.browser_list_workspace_tabs, (),
+         "Workspace not found", _ERR_WORKSPACE_NOT_FOUND),
+        ("claim_active", server.browser_claim_tab, ("panel1",),
+         "Tab is actively owned by session abc. Cannot claim tabs from active sessions.",
+         _ERR_ACTIVELY_OWNED),
+        ("claim_missing", server.browser_claim_tab, ("bad-id",),
+         "Tab not found in workspace: bad-id", _ERR_TAB_NOT_FOUND),
+        ("claim_limit", server.browser_claim_tab, ("panel5",),
+         "Session tab limit exceeded: 40/40 open, requested 1 more",
+         _ERR_TAB_LIMIT),
+    ]
+
+    @pytest.mark.parametrize("tool,args,err_msg,match",
+                             [c[1:] for c in CASES],
+                             ids=[c[0] for c in CASES])
+    async def test_error_propagation(self, tool, args, err_msg, match):
+        with use_ws(responses=[{"id": "x", "error": {"message": err_msg}}]):
+            with pytest.raises(Exception, match=match):
+                await tool(*args)
 
 
 class TestTabClaimingWorkflow:
     """Integration-style tests verifying the list -> claim -> use workflow."""
 
-    @pytest.mark.asyncio
+    # Canned list/claim results, built once at class creation.
+    LIST_RESP = [
+        {"tab_id": "agent-tab", "title": "Agent", "url": "https://a.com",
+         "ownership": "owned", "is_mine": True},
+        {"tab_id": "user-tab", "title": "User Page", "url": "https://b.com",
+         "ownership": "unclaimed", "is_mine": False},
+    ]
+    CLAIM_RESP = {
+        "success": True,
+        "tab_id": "user-tab",
+        "url": "https://b.com",
+        "title": "User Page",
+        "previous_owner": None,
+        "was_stale": False,
+    }
+    STALE_LIST_RESP = [
+        {"tab_id": "stale-tab", "title": "Stale Research", "url": "https://research.com",
+         "ownership": "stale", "is_mine": False, "owner_session_id": "agent-a-session"},
+    ]
+    STALE_CLAIM_RESP = {
+        "success": True,
+        "tab_id": "stale-tab",
+        "url": "https://research.com",
+        "title": "Stale Research",
+        "previous_owner": "agent-a-session",
+        "was_stale": True,
+    }
+    MIXED_RESP = [
+        {"tab_id": "t1", "title": "My Tab 1", "url": "u1", "ownership": "owned", "is_mine": True},
+        {"tab_id": "t2", "title": "My Tab 2", "url": "u2", "ownership": "owned", "is_mine": True},
+        {"tab_id": "t3", "title": "User Tab", "url": "u3", "ownership": "unclaimed", "is_mine": False},
+        {"tab_id": "t4", "title": "Other Agent", "url": "u4", "ownership": "owned", "is_mine": False,
+         "owner_session_id": "sess-b"},
+        {"tab_id": "t5", "title": "Dead Agent", "url": "u5", "ownership": "stale", "is_mine": False,
+         "owner_session_id": "sess-c"},
+    ]
+
     async def test_list_then_claim_workflow(self):
         """Simulate: list workspace tabs, find unclaimed, claim it."""
-        list_resp = [
-            {"tab_id": "agent-tab", "title": "Agent", "url": "https://a.com",
-             "ownership": "owned", "is_mine": True},
-            {"tab_id": "user-tab", "title": "User Page", "url": "https://b.com",
-             "ownership": "unclaimed", "is_mine": False},
-        ]
-        claim_resp = {
-            "success": True,
-            "tab_id": "user-tab",
-            "url": "https://b.com",
-            "title": "User Page",
-            "previous_owner": None,
-            "was_stale": False,
-        }
-        # Step 1: list workspace tabs
-        fake_ws1 = FakeWebSocket(responses=[{"id": "x", "result": list_resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws1):
+        # Both steps over one connection, as production would: the fake's
+        # response queue hands out frames in FIFO order.
+        with use_ws(_R(self.LIST_RESP) + _R(self.CLAIM_RESP)) as fake_ws:
+            # Step 1: list workspace tabs
             list_result = await server.browser_list_workspace_tabs()
-        tabs = json.loads(list_result)
-        unclaimed = [t for t in tabs if t["ownership"] == "unclaimed"]
-        assert len(unclaimed) == 1
-        assert unclaimed[0]["tab_id"] == "user-tab"
-
-        # Step 2: claim the unclaimed tab
-        fake_ws2 = FakeWebSocket(responses=[{"id": "x", "result": claim_resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws2):
+            tabs = _loads(list_result)
+            unclaimed = [t for t in tabs if t["ownership"] == "unclaimed"]
+            assert len(unclaimed) == 1
+            assert unclaimed[0]["tab_id"] == "user-tab"
+
+            # Step 2: claim the unclaimed tab
             claim_result = await server.browser_claim_tab(unclaimed[0]["tab_id"])
-        claimed = json.loads(claim_result)
+        claimed = _loads(claim_result)
         assert claimed["success"] is True
         assert claimed["tab_id"] == "user-tab"
 
-    @pytest.mark.asyncio
     async def test_claim_stale_from_another_agent(self):
         """Simulate: agent B claims a stale tab from agent A."""
-        list_resp = [
-            {"tab_id": "stale-tab", "title": "Stale Research", "url": "https://research.com",
-             "ownership": "stale", "is_mine": False, "owner_session_id": "agent-a-session"},
-        ]
-        claim_resp = {
-            "success": True,
-            "tab_id": "stale-tab",
-            "url": "https://research.com",
-            "title": "Stale Research",
-            "previous_owner": "agent-a-session",
-            "was_stale": True,
-        }
-        # List and verify stale
-        fake_ws1 = FakeWebSocket(responses=[{"id": "x", "result": list_resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws1):
+        with use_ws(_R(self.STALE_LIST_RESP) + _R(self.STALE_CLAIM_RESP)) as fake_ws:
+            # List and verify stale
             list_result = await server.browser_list_workspace_tabs()
-        tabs = json.loads(list_result)
-        stale_tabs = [t for t in tabs if t["ownership"] == "stale"]
-        assert len(stale_tabs) == 1
+            tabs = _loads(list_result)
+            stale_tabs = [t for t in tabs if t["ownership"] == "stale"]
+            assert len(stale_tabs) == 1
 
-        # Claim the stale tab
-        fake_ws2 = FakeWebSocket(responses=[{"id": "x", "result": claim_resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws2):
+            # Claim the stale tab
             claim_result = await server.browser_claim_tab("stale-tab")
-        claimed = json.loads(claim_result)
+        claimed = _loads(claim_result)
         assert claimed["previous_owner"] == "agent-a-session"
         assert claimed["was_stale"] is True
 
-    @pytest.mark.asyncio
     async def test_only_claimable_tabs_are_claimable(self):
         """Only unclaimed and stale tabs should be claimable; owned tabs should fail."""
         list_resp = [
             {"tab_id": "active-tab", "title": "Active", "url": "https://active.com",
              "ownership": "owned", "is_mine": False, "owner_session_id": "other-active"},
         ]
-        fake_ws1 = FakeWebSocket(responses=[{"id": "x", "result": list_resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws1):
+        err = {"id": "x", "error": {"message": "Tab is actively owned by session other-active. Cannot claim tabs from active sessions."}}
+        with use_ws(_R(list_resp) + [err]) as fake_ws:
             list_result = await server.browser_list_workspace_tabs()
-        tabs = json.loads(list_result)
-        assert tabs[0]["ownership"] == "owned"
+            tabs = _loads(list_result)
+            assert tabs[0]["ownership"] == "owned"
 
-        # Attempt to claim should fail
-        fake_ws2 = FakeWebSocket(
-            responses=[{"id": "x", "error": {"message": "Tab is actively owned by session other-active. Cannot claim tabs from active sessions."}}]
-        )
-        with patch.object(server, "get_ws", return_value=fake_ws2):
-            with pytest.raises(Exception, match="actively owned"):
+            # Attempt to claim should fail
+            with pytest.raises(Exception, match=_ERR_ACTIVELY_OWNED):
                 await server.browser_claim_tab("active-tab")
 
-    @pytest.mark.asyncio
     async def test_mixed_workspace_tabs_filtering(self):
         """Workspace should contain a mix of owned, unclaimed, and stale tabs."""
-        resp = [
-            {"tab_id": "t1", "title": "My Tab 1", "url": "u1", "ownership": "owned", "is_mine": True},
-            {"tab_id": "t2", "title": "My Tab 2", "url": "u2", "ownership": "owned", "is_mine": True},
-            {"tab_id": "t3", "title": "User Tab", "url": "u3", "ownership": "unclaimed", "is_mine": False},
-            {"tab_id": "t4", "title": "Other Agent", "url": "u4", "ownership": "owned", "is_mine": False,
-             "owner_session_id": "sess-b"},
-            {"tab_id": "t5", "title": "Dead Agent", "url": "u5", "ownership": "stale", "is_mine": False,
-             "owner_session_id": "sess-c"},
-        ]
-        fake_ws = FakeWebSocket(responses=[{"id": "x", "result": resp}])
-        with patch.object(server, "get_ws", return_value=fake_ws):
+        with use_ws(_R(self.MIXED_RESP)) as fake_ws:
             result = await server.browser_list_workspace_tabs()
-        data = json.loads(result)
+        data = _loads(result)
 
         mine = [t for t in data if t["is_mine"]]
         claimable = [t for t in data if t["ownership"] in ("unclaimed", "stale")]